@@ -0,0 +1,137 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+
+class ActionTracer:
+    """
+    Records how long every rendered action takes and how much XML it adds, grouped by action
+    type and by section of the report. finish() prints a summary table and, when trace_path is
+    given, writes the events as a Chrome trace that chrome://tracing or Perfetto can open.
+    """
+
+    def __init__(self, trace_path=None):
+        self.trace_path = trace_path
+
+        self.events = []
+        self._origin = time.perf_counter_ns()
+        self._section = "Перед першим розділом"
+        self._section_start = None
+        self._action_start = None
+        self._action_size = None
+
+    def _now(self):
+        return (time.perf_counter_ns() - self._origin) // 1000
+
+    def _add_event(self, name, category, start, end, **arguments):
+        self.events.append({'name': name, 'cat': category, 'start': start, 'end': end, 'args': arguments})
+
+    def start_section(self, name):
+        now = self._now()
+
+        if self._section_start is not None:
+            self._add_event(self._section, 'section', self._section_start, now)
+
+        self._section = name
+        self._section_start = now
+
+    def start_action(self, size):
+        self._action_size = size
+        self._action_start = self._now()
+
+    def end_action(self, method_name, size):
+        added = size - self._action_size if size is not None and self._action_size is not None else None
+        self._add_event(method_name, 'action', self._action_start, self._now(), section=self._section, size=added)
+
+    @contextmanager
+    def span(self, name):
+        """
+        Records a stage of the build that is not an action, for example the optimiser or saving.
+        """
+        start = self._now()
+        try:
+            yield
+        finally:
+            self._add_event(name, 'stage', start, self._now())
+
+    def _get_totals(self, key):
+        totals = {}
+
+        for event in self.events:
+            if event['cat'] != 'action':
+                continue
+
+            total = totals.setdefault(key(event), {'calls': 0, 'time': 0, 'size': None})
+            total['calls'] += 1
+            total['time'] += event['end'] - event['start']
+
+            if event['args']['size'] is not None:
+                total['size'] = (total['size'] or 0) + event['args']['size']
+
+        return totals
+
+    def get_summary(self):
+        """
+        Returns a table of the calls, time and added XML characters per action type, per section
+        and per stage.
+        """
+        lines = []
+        action_time = sum(event['end'] - event['start'] for event in self.events if event['cat'] == 'action')
+
+        for title, key in (("Action", lambda event: event['name']), ("Section", lambda event: event['args']['section'])):
+            totals = self._get_totals(key)
+
+            lines.append(f"{title:<40} {'Calls':>7} {'Time, ms':>10} {'Share':>7} {'XML chars':>12}")
+
+            for name, total in sorted(totals.items(), key=lambda item: item[1]['time'], reverse=True):
+                share = total['time'] / action_time * 100 if action_time else 0
+                size = "-" if total['size'] is None else total['size']
+                lines.append(f"{name[:40]:<40} {total['calls']:>7} {total['time'] / 1000:>10.1f} {share:>6.1f}% {size:>12}")
+
+            lines.append("")
+
+        for event in self.events:
+            if event['cat'] == 'stage':
+                lines.append(f"{event['name'][:40]:<40} {'':>7} {(event['end'] - event['start']) / 1000:>10.1f}")
+
+        return "\n".join(lines).rstrip()
+
+    def save_chrome_trace(self, trace_path):
+        """
+        Writes the events in the Chrome trace event format. Sections, actions and stages are
+        shown on separate tracks.
+        """
+        tracks = {'section': 1, 'action': 2, 'stage': 3}
+        pid = os.getpid()
+
+        trace_events = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': category}}
+            for category, tid in tracks.items()
+        ]
+
+        for event in self.events:
+            trace_events.append({
+                'name': event['name'],
+                'cat': event['cat'],
+                'ph': 'X',
+                'ts': event['start'],
+                'dur': event['end'] - event['start'],
+                'pid': pid,
+                'tid': tracks[event['cat']],
+                'args': event['args'],
+            })
+
+        with open(trace_path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+
+    def finish(self):
+        if self._section_start is not None:
+            self._add_event(self._section, 'section', self._section_start, self._now())
+            self._section_start = None
+
+        print(self.get_summary())
+
+        if self.trace_path is not None:
+            self.save_chrome_trace(self.trace_path)
+            print(f"Trace saved: {self.trace_path}")
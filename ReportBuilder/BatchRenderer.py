@@ -0,0 +1,80 @@
+import argparse
+import os
+import runpy
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import config
+from ReportSpec import SPEC_EXTENSIONS, build_report
+
+
+def _render_report(script_path):
+    """
+    Runs one report script, or builds one JSON/TOML report spec, in its own directory with a
+    fresh source list. Returns the text of the error instead of raising it, so one broken
+    report does not stop the others.
+    """
+    script_path = os.path.abspath(script_path)
+    script_directory = os.path.dirname(script_path)
+    current_directory = os.getcwd()
+
+    config.new_source_list()
+    sys.path.insert(0, script_directory)
+
+    try:
+        os.chdir(script_directory)
+        if script_path.lower().endswith(SPEC_EXTENSIONS):
+            build_report(script_path)
+        else:
+            runpy.run_path(script_path, run_name="__main__")
+        return None
+    except SystemExit as e:
+        # A script that ends with sys.exit(0) or sys.exit() has succeeded.
+        return None if e.code in (0, None) else traceback.format_exc()
+    except Exception:
+        return traceback.format_exc()
+    finally:
+        os.chdir(current_directory)
+        sys.path.remove(script_directory)
+
+
+def render_reports(script_paths, jobs=None):
+    """
+    Renders report scripts such as practice.py or report specs across a process pool and prints
+    the progress.
+    Returns a dictionary of the scripts that failed with their errors.
+    """
+    failures = {}
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(_render_report, script_path): script_path for script_path in script_paths}
+
+        for done, future in enumerate(as_completed(futures), start=1):
+            script_path = futures[future]
+
+            try:
+                error = future.result()
+            except Exception as e:
+                error = f"Worker process failed: {e!r}"
+
+            if error is not None:
+                failures[script_path] = error
+
+            print(f"[{done}/{len(futures)}] {'FAILED' if error else 'OK'} {script_path}")
+
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Renders several report scripts in parallel.")
+    parser.add_argument("scripts", nargs="+", help="report scripts or specs, e.g. students/*/practice.py")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+    args = parser.parse_args()
+
+    failures = render_reports(args.scripts, args.jobs)
+
+    for script_path, error in failures.items():
+        print(f"\n{script_path}:\n{error}")
+
+    sys.exit(1 if failures else 0)
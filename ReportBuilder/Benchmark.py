@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from PIL import Image
+
+from ReportBuilder import ReportBuilder
+from SourceList import SourceList
+
+_SENTENCE = ("Під час практики студент виконує завдання підприємства, працює з документацією "
+             "та закріплює знання, отримані під час навчання. ")
+
+
+def _create_files(directory, images, listings, image_size, listing_lines):
+    """
+    Writes distinct images and source files for the report to include and returns their paths.
+    """
+    image_paths = []
+    for number in range(images):
+        image_path = os.path.join(directory, f"image_{number}.png")
+        Image.new('RGB', image_size, (number * 37 % 256, number * 71 % 256, number * 113 % 256)).save(image_path)
+        image_paths.append(image_path)
+
+    listing_paths = []
+    for number in range(listings):
+        listing_path = os.path.join(directory, f"listing_{number}.py")
+        with open(listing_path, 'w', encoding='utf-8') as f:
+            for line in range(listing_lines):
+                f.write(f"def function_{number}_{line}(value):\n    return value * {line}  # listing {number}\n")
+        listing_paths.append(listing_path)
+
+    return image_paths, listing_paths
+
+
+def _record(report, options, image_paths, listing_paths):
+    """
+    Records a report with the given number of elements in every sub-sub-section. Images and
+    listings are spread over the report in turn.
+    """
+    paragraph = _SENTENCE * options.sentences
+    list_text = "Перелік завдань\n" + "\n".join(f"завдання {item}\n    етап {item}.1\n    етап {item}.2"
+                                                  for item in range(options.list_items))
+    table = [["№", "Завдання", "Результат"]] + [[str(row), f"завдання {row}", "виконано"]
+                                                 for row in range(options.table_rows)]
+    next_image = 0
+    next_listing = 0
+
+    report.add_introduction(paragraph)
+
+    for section in range(options.sections):
+        report.add_section(f"Розділ {section}")
+
+        for sub_section in range(options.sub_sections):
+            report.add_sub_section(f"Підрозділ {section}.{sub_section}")
+
+            for sub_sub_section in range(options.sub_sub_sections):
+                report.add_sub_sub_section(f"Пункт {section}.{sub_section}.{sub_sub_section}")
+
+                for _ in range(options.paragraphs):
+                    report.add_text(paragraph)
+
+                for _ in range(options.lists):
+                    report.add_list(list_text)
+
+                for _ in range(options.tables):
+                    report.add_table("Результати", table)
+
+                for _ in range(options.images_per_section):
+                    if image_paths:
+                        report.add_image(image_paths[next_image % len(image_paths)], "Схема")
+                        next_image += 1
+
+                for _ in range(options.listings_per_section):
+                    if listing_paths:
+                        report.add_listing(listing_paths[next_listing % len(listing_paths)])
+                        next_listing += 1
+
+    report.add_source_list()
+
+
+def run_benchmark(options):
+    """
+    Builds one synthetic report and returns the time of every stage, the rendering time per
+    report method, the peak memory and the size of the document.
+    """
+    report_class = None
+    if options.backend == 'ooxml':
+        from OoxmlWordReportBuilder import OoxmlWordReportBuilder
+        report_class = OoxmlWordReportBuilder
+
+    if options.tracemalloc:
+        tracemalloc.start()
+
+    with tempfile.TemporaryDirectory() as directory:
+        image_paths, listing_paths = _create_files(directory, options.images, options.listings,
+                                                   (options.image_width, options.image_height), options.listing_lines)
+        filename = os.path.join(directory, "benchmark.docx")
+
+        start = time.perf_counter()
+        builder = ReportBuilder(filename, report_class=report_class, source_list=SourceList())
+        _record(builder, options, image_paths, listing_paths)
+        recorded = time.perf_counter()
+
+        builder._get_report()
+        created = time.perf_counter()
+
+        actions = builder._optimize_empty_lines(builder._actions)
+        optimized = time.perf_counter()
+
+        by_method = {}
+        for action in actions:
+            action_start = time.perf_counter()
+            builder._execute_action(*action)
+            method_time = by_method.setdefault(action[0], {'count': 0, 'seconds': 0.0})
+            method_time['count'] += 1
+            method_time['seconds'] += time.perf_counter() - action_start
+        builder._image_loader.shutdown()
+        rendered = time.perf_counter()
+
+        builder._get_report()._save_document()
+        saved = time.perf_counter()
+
+        output_bytes = os.path.getsize(filename)
+
+    results = {
+        'record_s': recorded - start,
+        'backend_init_s': created - recorded,
+        'optimize_s': optimized - created,
+        'render_s': rendered - optimized,
+        'save_s': saved - rendered,
+        'total_s': saved - start,
+        'recorded_actions': len(builder._actions),
+        'rendered_actions': len(actions),
+        'render_by_method': dict(sorted(by_method.items(), key=lambda item: item[1]['seconds'], reverse=True)),
+        'output_bytes': output_bytes,
+        'peak_rss_kb': _get_peak_rss_kb(),
+    }
+
+    if options.tracemalloc:
+        results['peak_traced_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return results
+
+
+def _get_peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Times the report pipeline on a synthetic report and prints JSON.")
+    parser.add_argument("--backend", choices=["word", "ooxml"], default="word", help="report backend")
+    parser.add_argument("--sections", type=int, default=3)
+    parser.add_argument("--sub-sections", type=int, default=3, help="sub-sections in every section")
+    parser.add_argument("--sub-sub-sections", type=int, default=2, help="sub-sub-sections in every sub-section")
+    parser.add_argument("--paragraphs", type=int, default=5, help="paragraphs in every sub-sub-section")
+    parser.add_argument("--sentences", type=int, default=4, help="sentences in every paragraph")
+    parser.add_argument("--lists", type=int, default=1, help="nested lists in every sub-sub-section")
+    parser.add_argument("--list-items", type=int, default=5)
+    parser.add_argument("--tables", type=int, default=1, help="tables in every sub-sub-section")
+    parser.add_argument("--table-rows", type=int, default=20)
+    parser.add_argument("--images", type=int, default=5, help="distinct image files")
+    parser.add_argument("--images-per-section", type=int, default=1, help="images in every sub-sub-section")
+    parser.add_argument("--image-width", type=int, default=1600)
+    parser.add_argument("--image-height", type=int, default=1200)
+    parser.add_argument("--listings", type=int, default=5, help="distinct source files")
+    parser.add_argument("--listings-per-section", type=int, default=1, help="listings in every sub-sub-section")
+    parser.add_argument("--listing-lines", type=int, default=100)
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="also measure the peak of Python allocations, which slows the run down")
+    parser.add_argument("--output", help="file to write the JSON to instead of printing it")
+    args = parser.parse_args()
+
+    report = {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'config': vars(args),
+        'results': run_benchmark(args),
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
@@ -0,0 +1,97 @@
+import copy
+import re
+
+from Numbering import Numbering
+
+REFERENCE_PATTERN = re.compile(r'\{ref:([^{}]+)\}')
+
+
+class CrossReferences:
+    """
+    Numbers the labelled images, tables and listings of a report before it is rendered, so a
+    text can refer to them with {ref:label} before they appear. assign() makes one pass over
+    the actions with the same Numbering the backend uses, resolve() substitutes the numbers
+    into the texts; the report itself is rendered once.
+    """
+
+    _HEADING_LEVELS = {'add_section': 0, 'add_sub_section': 1, 'add_sub_sub_section': 2}
+
+    _CLEARED_HEADING_LEVELS = {'_remove_section_number': 0, '_remove_sub_section_number': 1,
+                               '_remove_sub_sub_section_number': 2}
+
+    _ELEMENT_KINDS = {'add_image': 'image', 'add_table': 'table', 'add_listing': 'listing'}
+
+    # Actions whose text may contain references.
+    _REFERENCE_ACTIONS = {'add_text'}
+
+    def __init__(self, numbering_state, listing_reader):
+        """
+        numbering_state is the Numbering snapshot of the backend before the actions, and
+        listing_reader its ListingReader, which decides which listings are left out and so do
+        not get a number.
+        """
+        self.numbering_state = numbering_state
+        self.listing_reader = listing_reader
+
+        self.numbers = {}
+
+    def assign(self, actions):
+        numbering = Numbering()
+        numbering.restore(self.numbering_state)
+
+        # Listings are only checked when one of them has a label: other kinds are numbered
+        # separately, so a left out listing changes no other number.
+        listing_reader = None
+        if any(method_name == 'add_listing' and 'label' in kwargs for method_name, args, kwargs in actions):
+            listing_reader = copy.copy(self.listing_reader)
+
+        for method_name, args, kwargs in actions:
+            if method_name in self._HEADING_LEVELS:
+                numbering.start_heading(self._HEADING_LEVELS[method_name])
+            elif method_name in self._CLEARED_HEADING_LEVELS:
+                numbering.clear_heading(self._CLEARED_HEADING_LEVELS[method_name])
+            elif method_name in self._ELEMENT_KINDS:
+                if method_name == 'add_listing':
+                    if listing_reader is None or not self._is_listing_shown(listing_reader, args[0]):
+                        continue
+
+                number = numbering.next_label(self._ELEMENT_KINDS[method_name])
+
+                label = kwargs.get('label')
+                if label is not None:
+                    if label in self.numbers:
+                        raise ValueError(f"Label {label} is used more than once")
+                    self.numbers[label] = number
+
+    def _is_listing_shown(self, listing_reader, file_path):
+        try:
+            if listing_reader.check(file_path) is not None:
+                return False
+
+            listing_reader.reserve(file_path)
+        except OSError:
+            return False
+
+        return True
+
+    def _get_number(self, match):
+        label = match.group(1)
+
+        if label not in self.numbers:
+            raise ValueError(f"Unknown label: {label}")
+
+        return self.numbers[label]
+
+    def resolve(self, actions):
+        """
+        Returns the actions with every {ref:label} in their texts replaced by the number.
+        """
+        resolved_actions = []
+
+        for method_name, args, kwargs in actions:
+            if method_name in self._REFERENCE_ACTIONS:
+                args = (REFERENCE_PATTERN.sub(self._get_number, args[0]),) + args[1:]
+
+            resolved_actions.append((method_name, args, kwargs))
+
+        return resolved_actions
@@ -0,0 +1,95 @@
+import codecs
+import csv
+import itertools
+
+# The encoding Excel uses for Cyrillic CSV files, assumed when a file is not UTF-8 or UTF-16.
+_FALLBACK_ENCODING = 'cp1251'
+
+_DELIMITERS = (',', ';', '\t', '|')
+
+
+class CsvTable:
+    """
+    The rows of a CSV or TSV file for add_table(). The file is read row by row only when the
+    table is rendered, so its size does not matter. The encoding and the delimiter are
+    recognised from the first bytes unless given. columns selects and orders the columns by
+    header name or by index.
+    """
+
+    SAMPLE_SIZE = 16384
+
+    def __init__(self, path, columns=None, delimiter=None, encoding=None):
+        self.path = path
+        self.columns = list(columns) if columns is not None else None
+        self.delimiter = delimiter
+        self.encoding = encoding
+
+    def _read_sample(self):
+        with open(self.path, 'rb') as f:
+            return f.read(self.SAMPLE_SIZE)
+
+    def _detect_encoding(self, sample):
+        if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return 'utf-16'
+
+        try:
+            codecs.getincrementaldecoder('utf-8')().decode(sample, final=len(sample) < self.SAMPLE_SIZE)
+        except UnicodeDecodeError:
+            return _FALLBACK_ENCODING
+
+        return 'utf-8-sig'
+
+    def _detect_delimiter(self, text):
+        """
+        Takes the candidate that occurs most often in the first line, which is the header row
+        in exported spreadsheets.
+        """
+        first_line = text.lstrip('\r\n').split('\n', 1)[0]
+        delimiter = max(_DELIMITERS, key=first_line.count)
+
+        if first_line.count(delimiter):
+            return delimiter
+
+        return '\t' if self.path.lower().endswith('.tsv') else ','
+
+    def _get_indexes(self, header):
+        header = [name.strip() for name in header]
+        indexes = []
+
+        for column in self.columns:
+            if isinstance(column, int):
+                indexes.append(column)
+            elif column in header:
+                indexes.append(header.index(column))
+            else:
+                raise ValueError(f"Column {column} not found in {self.path}")
+
+        return indexes
+
+    def __iter__(self):
+        encoding = self.encoding
+        delimiter = self.delimiter
+
+        if encoding is None or delimiter is None:
+            sample = self._read_sample()
+
+            if encoding is None:
+                encoding = self._detect_encoding(sample)
+            if delimiter is None:
+                delimiter = self._detect_delimiter(sample.decode(encoding, errors='ignore'))
+
+        with open(self.path, encoding=encoding, newline='') as f:
+            rows = (row for row in csv.reader(f, delimiter=delimiter) if row)
+
+            if self.columns is None:
+                yield from rows
+                return
+
+            header = next(rows, None)
+            if header is None:
+                return
+
+            indexes = self._get_indexes(header)
+
+            for row in itertools.chain([header], rows):
+                yield [row[i] if i < len(row) else "" for i in indexes]
@@ -0,0 +1,42 @@
+class EmptyLineOptimizer:
+    """
+    Decides which empty lines between actions are kept. Actions are pushed one by one and
+    released as soon as the empty line in front of them is decided, so at most one empty
+    line is held back at any moment.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+
+        self._prev_action = None
+        self._empty_line = None
+
+    def push(self, action):
+        """
+        Accepts the next action and returns the actions that are ready to be executed.
+        Repeated empty lines are collapsed, an empty line at the start is dropped and an
+        empty line between a pair of actions from the rules is removed.
+        """
+        method_name = action[0]
+
+        if method_name == '_add_empty_line':
+            if self._prev_action is not None and self._empty_line is None:
+                self._empty_line = action
+            return []
+
+        ready_actions = []
+
+        if self._empty_line is not None and (self._prev_action, method_name) not in self.rules:
+            ready_actions.append(self._empty_line)
+
+        self._empty_line = None
+        ready_actions.append(action)
+        self._prev_action = method_name
+
+        return ready_actions
+
+    def flush(self):
+        """
+        Finishes the sequence. An empty line left at the end is dropped.
+        """
+        self._empty_line = None
@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+
+from ImageLoader import LoadedImage, load_image
+
+MANIFEST_VERSION = 1
+
+
+class FileManifest:
+    """
+    Remembers what was learned about the files of a project between runs: size, modification
+    time, content hash, whether a file can be shown as a listing and the type and dimensions of
+    images. An entry is used only while the size and modification time of the file are the same,
+    so unchanged files are not read or probed again. The manifest is written to a temporary file
+    and renamed, so an interrupted save leaves the previous version intact.
+    """
+
+    def __init__(self, path='.file_manifest.json'):
+        self.path = path
+
+        self._entries = self._load()
+        self._changed = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+            return {}
+
+        return manifest.get('files', {})
+
+    def _get_entry(self, file_path):
+        """
+        Returns the key of the file and its entry, a new empty one when the file has changed.
+        """
+        key = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+                entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+        return key, entry
+
+    def _set_entry(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._changed = True
+
+    def load_image(self, image_path):
+        """
+        Returns the image as load_image() does, without reading the file if it is unchanged.
+        """
+        key, entry = self._get_entry(image_path)
+
+        if 'sha1' in entry:
+            from ManifestImage import ManifestImage
+            return LoadedImage(image_path, ManifestImage(image_path, entry), entry['sha1'])
+
+        loaded_image = load_image(image_path)
+        image = loaded_image.image
+
+        self._set_entry(key, dict(entry, type='image', sha1=loaded_image.sha1, content_type=image.content_type,
+                                  px_width=image.px_width, px_height=image.px_height,
+                                  horz_dpi=image.horz_dpi, vert_dpi=image.vert_dpi))
+
+        return loaded_image
+
+    def check_listing(self, file_path, listing_reader, data=None):
+        """
+        Returns listing_reader.check_content() for the file, from the manifest if the file and
+        the settings of the reader are unchanged.
+        """
+        key, entry = self._get_entry(file_path)
+        settings = [listing_reader.PREFIX_SIZE, listing_reader.max_average_line_length]
+
+        if entry.get('listing_settings') == settings:
+            return entry['skip_reason']
+
+        skip_reason = listing_reader.check_content(file_path, data)
+        self._set_entry(key, dict(entry, type='text' if skip_reason is None else 'skipped',
+                                  listing_settings=settings, skip_reason=skip_reason))
+
+        return skip_reason
+
+    def save(self):
+        """
+        Writes the manifest if anything was added, dropping the entries of deleted files.
+        """
+        with self._lock:
+            if not self._changed:
+                return
+
+            files = {key: entry for key, entry in self._entries.items() if os.path.exists(key)}
+            self._changed = False
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': files}, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
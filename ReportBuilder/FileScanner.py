@@ -0,0 +1,165 @@
+import fnmatch
+import os
+import re
+
+# Directories that never belong in a report: version control, IDE settings and caches.
+DEFAULT_IGNORE_PATTERNS = (
+    '.git', '.hg', '.svn', '.idea', '.vscode', '.vs', '__pycache__', '.image_cache', '.plan_cache', '.fragment_cache',
+)
+
+# Dependencies and build output. Some projects keep their sources under these names, so they are
+# skipped only when added to the defaults: DEFAULT_IGNORE_PATTERNS + BUILD_IGNORE_PATTERNS.
+BUILD_IGNORE_PATTERNS = (
+    'node_modules', '.venv', 'venv', 'build', 'dist', 'out', 'CMakeFiles', 'cmake-build-*',
+)
+
+_NUMBER = re.compile(r'(\d+)')
+
+
+def natural_sort_key(text):
+    """
+    Sorts numbers inside names by value, so "5.1.png" comes before "10.png". Surrounding
+    spaces and letter case are ignored.
+    """
+    return [int(part) if part.isdigit() else part.casefold() for part in _NUMBER.split(text.strip())]
+
+
+def _compile_gitignore_pattern(pattern):
+    """
+    Turns one .gitignore line into a regular expression for paths relative to the directory of
+    the .gitignore file. Returns the expression, whether the line is negated with "!" and
+    whether it only matches directories.
+    """
+    negated = pattern.startswith('!')
+    if negated:
+        pattern = pattern[1:]
+
+    directory_only = pattern.endswith('/')
+    pattern = pattern.rstrip('/')
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+
+    regex = []
+    i = 0
+
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            regex.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            regex.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            regex.append('[^/]')
+            i += 1
+        elif pattern[i] == '[' and pattern.find(']', i + 1) != -1:
+            end = pattern.find(']', i + 1)
+            characters = pattern[i + 1:end]
+            if characters.startswith('!'):
+                characters = '^' + characters[1:]
+            regex.append(f'[{characters}]')
+            i = end + 1
+        elif pattern[i] == '\\' and i + 1 < len(pattern):
+            regex.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+
+    if not anchored:
+        regex.insert(0, '(?:.*/)?')
+
+    return re.compile("".join(regex)), negated, directory_only
+
+
+def _read_gitignore(path):
+    rules = []
+
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.rstrip('\n').rstrip()
+
+            if line and not line.startswith('#'):
+                rules.append(_compile_gitignore_pattern(line))
+
+    return rules
+
+
+class FileScanner:
+    """
+    Finds the files with the given extensions under a directory in natural order. Directories
+    and files matching ignore_patterns (shell globs for single names), CMake build trees and
+    whatever the .gitignore files inside the directory exclude are skipped without descending
+    into them. Symbolic links to directories are not followed, as with os.walk().
+    """
+
+    def __init__(self, extensions=None, ignore_patterns=DEFAULT_IGNORE_PATTERNS, use_gitignore=True):
+        self.extensions = {extension.lower() for extension in extensions} if extensions is not None else None
+        self.ignore_patterns = tuple(ignore_patterns)
+        self.use_gitignore = use_gitignore
+
+        self._ignore = None
+        if self.ignore_patterns:
+            self._ignore = re.compile("|".join(fnmatch.translate(pattern) for pattern in self.ignore_patterns))
+
+    def _has_extension(self, file_name):
+        if self.extensions is None:
+            return True
+
+        dot = file_name.rfind('.')
+        return dot != -1 and file_name[dot:].lower() in self.extensions
+
+    def _is_gitignored(self, relative_path, is_directory, gitignores):
+        ignored = False
+
+        for base, rules in gitignores:
+            path = relative_path[len(base) + 1:] if base else relative_path
+
+            for regex, negated, directory_only in rules:
+                if (is_directory or not directory_only) and regex.fullmatch(path):
+                    ignored = not negated
+
+        return ignored
+
+    def scan(self, directory):
+        """
+        Returns the paths of the found files, joined to directory as os.walk() does. The files
+        of a directory come before the files of its subdirectories.
+        """
+        files = []
+        self._scan(directory, "", [], files)
+        return files
+
+    def _scan(self, directory, relative_directory, gitignores, files):
+        with os.scandir(directory) as entries:
+            entries = list(entries)
+
+        names = {entry.name for entry in entries}
+
+        if relative_directory and 'CMakeCache.txt' in names:
+            return
+
+        if self.use_gitignore and '.gitignore' in names:
+            gitignores = gitignores + [(relative_directory, _read_gitignore(os.path.join(directory, '.gitignore')))]
+
+        entries.sort(key=lambda entry: natural_sort_key(entry.name))
+        subdirectories = []
+
+        for entry in entries:
+            if self._ignore is not None and self._ignore.match(entry.name):
+                continue
+
+            relative_path = f"{relative_directory}/{entry.name}" if relative_directory else entry.name
+
+            if entry.is_dir(follow_symlinks=False):
+                if not self._is_gitignored(relative_path, True, gitignores):
+                    subdirectories.append((entry.path, relative_path))
+            elif self._has_extension(entry.name) and entry.is_file():
+                if not self._is_gitignored(relative_path, False, gitignores):
+                    files.append(entry.path)
+
+        for path, relative_path in subdirectories:
+            self._scan(path, relative_path, gitignores, files)
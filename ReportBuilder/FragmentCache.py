@@ -0,0 +1,118 @@
+import hashlib
+import os
+import pickle
+from concurrent.futures import Future
+
+from CsvTable import CsvTable
+from ImageLoader import find_image
+
+# Increase when the rendered XML changes, so fragments rendered by older code are not reused.
+FRAGMENT_VERSION = 6
+
+
+class FragmentCache:
+    """
+    Keeps the rendered body XML of every section of a report on disk, together with the images
+    and headings it added and the numbering it leaves behind. The key covers the actions of the section, the
+    numbering state the section starts with and the files it reads, so an unchanged section is
+    spliced back without rendering it again. prune() removes the fragments the last build did
+    not use, so the directory does not grow with every edit.
+    """
+
+
+    def __init__(self, directory='.fragment_cache'):
+        self.directory = directory
+
+        self.reused = 0
+        self.rendered = 0
+
+        self._used_keys = set()
+
+    def _get_file_stamp(self, file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+
+        return stat.st_size, stat.st_mtime_ns
+
+    def get_key(self, actions, state, source_list):
+        """
+        Returns the key of the section, or None when its actions cannot be stored, for example
+        a table whose rows come from a generator.
+        """
+        key_actions = []
+        file_stamps = []
+
+        for method_name, args, kwargs in actions:
+            kwargs = {key: value for key, value in kwargs.items() if not isinstance(value, Future)}
+            key_actions.append((method_name, args, kwargs))
+
+            if method_name == 'add_image':
+                file_stamps.append(self._get_file_stamp(find_image(args[0])))
+            elif method_name == 'add_listing':
+                file_stamps.append(self._get_file_stamp(args[0]))
+            elif method_name == 'add_table' and isinstance(args[1], CsvTable):
+                file_stamps.append(self._get_file_stamp(args[1].path))
+
+        sources = None
+        if any(method_name == 'add_source_list' for method_name, args, kwargs in actions):
+            sources = source_list.get_sources()
+
+        key_data = (FRAGMENT_VERSION, key_actions, state, file_stamps, sources)
+
+        try:
+            return hashlib.sha256(pickle.dumps(key_data, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+        except (TypeError, pickle.PicklingError):
+            return None
+
+    def _get_path(self, key):
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def load(self, key):
+        """
+        Returns the fragment stored under the key, or None when there is none or the images it
+        refers to are gone.
+        """
+        try:
+            with open(self._get_path(key), 'rb') as f:
+                fragment = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        if not all(os.path.exists(image_path) for *_, image_path in fragment['media']):
+            return None
+
+        self.reused += 1
+        self._used_keys.add(key)
+        return fragment
+
+    def store(self, key, fragment):
+        self.rendered += 1
+        self._used_keys.add(key)
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        path = self._get_path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump(fragment, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+    def prune(self):
+        """
+        Removes the fragments that were neither reused nor stored since the cache was created.
+        """
+        try:
+            file_names = os.listdir(self.directory)
+        except OSError:
+            return
+
+        for file_name in file_names:
+            key, extension = os.path.splitext(file_name)
+
+            if extension == '.pickle' and key not in self._used_keys:
+                try:
+                    os.remove(os.path.join(self.directory, file_name))
+                except OSError:
+                    pass
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import threading
+
+from PIL import Image
+
+
+class ImageCache:
+    """
+    Resamples images to the pixel size they need at the width they are shown with and keeps the
+    results on disk, keyed by the hash of the original content and the target parameters, so
+    repeated builds reuse them. prepare() may be called from several threads.
+    """
+
+    RESAMPLED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.tiff'}
+
+    def __init__(self, directory='.image_cache', dpi=300):
+        self.directory = directory
+        self.dpi = dpi
+
+        self.saved_bytes = 0
+        self._lock = threading.Lock()
+
+    def _get_cached_path(self, image_path, target_width, content_hash):
+        if content_hash is None:
+            with open(image_path, 'rb') as f:
+                content_hash = hashlib.sha1(f.read()).hexdigest()
+
+        extension = '.jpg' if image_path.lower().endswith(('.jpg', '.jpeg')) else '.png'
+
+        return os.path.join(self.directory, f"{content_hash}_{target_width}_{self.dpi}{extension}")
+
+    def _resample(self, image_path, cached_path, target_width):
+        with Image.open(image_path) as image:
+            if image.width <= target_width:
+                return False
+
+            target_height = max(1, round(image.height * target_width / image.width))
+            resampled = image.resize((target_width, target_height), Image.LANCZOS)
+
+            if cached_path.endswith('.jpg'):
+                resampled = resampled.convert('RGB')
+                save_options = {'quality': 90, 'optimize': True}
+            else:
+                save_options = {'optimize': True}
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        temp_path = f"{cached_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        resampled.save(temp_path, format='JPEG' if cached_path.endswith('.jpg') else 'PNG',
+                       dpi=(self.dpi, self.dpi), **save_options)
+        os.replace(temp_path, cached_path)
+
+        return True
+
+    def prepare(self, image_path, width, content_hash=None):
+        """
+        Returns the path of the image to embed at the given width: the cached resampled copy,
+        or the original image when it is not larger than needed or cannot be resampled.
+        content_hash is the SHA-1 of the image if it is already known, otherwise it is computed.
+        """
+        if os.path.splitext(image_path)[1].lower() not in self.RESAMPLED_EXTENSIONS:
+            return image_path
+
+        target_width = round(width.inches * self.dpi)
+        cached_path = self._get_cached_path(image_path, target_width, content_hash)
+
+        if not os.path.exists(cached_path) and not self._resample(image_path, cached_path, target_width):
+            return image_path
+
+        saved_bytes = os.path.getsize(image_path) - os.path.getsize(cached_path)
+
+        if saved_bytes <= 0:
+            return image_path
+
+        with self._lock:
+            self.saved_bytes += saved_bytes
+
+        return cached_path
@@ -0,0 +1,63 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+LoadedImage = namedtuple('LoadedImage', ['path', 'image', 'sha1'])
+
+
+def load_image(image_path):
+    # Imported here so that importing ReportBuilder does not load python-docx before rendering.
+    from docx.image.image import Image
+
+    image = Image.from_file(image_path)
+
+    return LoadedImage(image_path, image, image.sha1)
+
+
+def find_image(image_path):
+    """
+    Returns the path an image is read from: the path itself, or when it does not exist the file
+    of the same name in the Images directory.
+    """
+    if os.path.exists(image_path):
+        return image_path
+
+    return os.path.join('Images', os.path.basename(image_path))
+
+
+class ImageLoader:
+    """
+    Reads and probes images in a thread pool. submit() returns a future per image; the futures
+    are consumed in the order the images were submitted, so the document order does not depend
+    on which image finishes loading first.
+    """
+
+    def __init__(self, workers=4, image_cache=None, manifest=None):
+        self.workers = workers
+        self.image_cache = image_cache
+        self.manifest = manifest
+
+        self._executor = None
+
+    def _load(self, image_path, width):
+        if self.manifest is None:
+            if self.image_cache is not None:
+                image_path = self.image_cache.prepare(image_path, width)
+
+            return load_image(image_path)
+
+        if self.image_cache is not None:
+            image_path = self.image_cache.prepare(image_path, width, self.manifest.load_image(image_path).sha1)
+
+        return self.manifest.load_image(image_path)
+
+    def submit(self, image_path, width):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        return self._executor.submit(self._load, image_path, width)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,175 @@
+import codecs
+import io
+import mmap
+import os
+import re
+
+# Control characters that cannot be stored in document XML.
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+class ListingReader:
+    """
+    Reads the source files of listings in chunks of whole lines, so a large file is never held
+    in memory at once. Every file and the report as a whole have a size budget; a listing that
+    does not fit is cut at a line boundary and ends with a note. Binary and minified files are
+    recognised from the first bytes and left out. Long lines mark a file as minified only when
+    max_average_line_length is given, so text and data files with long lines are kept. The
+    bytes of a file can be read ahead with prefetch() and given to check() and read() instead
+    of the file being opened again.
+    """
+
+    PREFIX_SIZE = 8192
+
+    def __init__(self, max_file_bytes=1 << 20, max_report_bytes=16 << 20, chunk_size=1 << 16, use_mmap=False,
+                 max_average_line_length=None, manifest=None):
+        self.max_file_bytes = max_file_bytes
+        self.max_report_bytes = max_report_bytes
+        self.chunk_size = chunk_size
+        self.use_mmap = use_mmap
+        self.max_average_line_length = max_average_line_length
+        self.manifest = manifest
+
+        self.report_bytes = 0
+
+    def check(self, file_path, data=None):
+        """
+        Returns why the file cannot be shown as a listing, or None when it can. data is the
+        result of prefetch() for the file, if it was read ahead.
+        """
+        if self.report_bytes >= self.max_report_bytes:
+            return f"лістинги звіту вже займають {self.max_report_bytes} байт"
+
+        if '.min.' in os.path.basename(file_path).lower():
+            return "мініфікований файл"
+
+        if self.manifest is not None:
+            return self.manifest.check_listing(file_path, self, data)
+
+        return self.check_content(file_path, data)
+
+    def check_content(self, file_path, data=None):
+        """
+        Recognises binary, non-UTF-8 and minified files from the first bytes.
+        """
+        if data is not None:
+            prefix = data[:self.PREFIX_SIZE]
+        else:
+            with open(file_path, 'rb') as f:
+                prefix = f.read(self.PREFIX_SIZE)
+
+        if b'\x00' in prefix:
+            return "двійковий файл"
+
+        try:
+            text = codecs.getincrementaldecoder('utf-8')().decode(prefix, final=len(prefix) < self.PREFIX_SIZE)
+        except UnicodeDecodeError:
+            return "файл не в кодуванні UTF-8"
+
+        if (self.max_average_line_length is not None
+                and len(text) / (text.count('\n') + 1) > self.max_average_line_length):
+            return "мініфікований файл"
+
+        return None
+
+    def reserve(self, file_path):
+        """
+        Counts the file against the report budget as read() would, without reading it.
+        """
+        budget = min(self.max_file_bytes, self.max_report_bytes - self.report_bytes)
+        self.report_bytes += min(os.path.getsize(file_path), budget)
+
+    def prefetch(self, file_path):
+        """
+        Reads as much of the file as a listing can show. Returns None when it cannot be read,
+        so the error is reported when the listing is rendered.
+        """
+        try:
+            with open(file_path, 'rb') as f:
+                return f.read(self.max_file_bytes)
+        except OSError:
+            return None
+
+    def _read_blocks(self, file_path, data):
+        if data is not None:
+            for start in range(0, len(data), self.chunk_size):
+                yield data[start:start + self.chunk_size]
+            return
+
+        with open(file_path, 'rb') as f:
+            if self.use_mmap and os.fstat(f.fileno()).st_size > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    for start in range(0, len(mapped), self.chunk_size):
+                        yield mapped[start:start + self.chunk_size]
+            else:
+                while block := f.read(self.chunk_size):
+                    yield block
+
+    def read(self, file_path, data=None):
+        """
+        Yields the text of the file in chunks that end at a line break, with line breaks
+        translated as in text mode. When the budget runs out, the text ends with the last whole
+        line, or with the part of the first line that fits when even that line does not, and the
+        last chunk is the note about the truncation. Characters that XML cannot hold are
+        replaced with U+FFFD.
+        """
+        file_size = os.path.getsize(file_path)
+        budget = min(self.max_file_bytes, self.max_report_bytes - self.report_bytes)
+        decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder('utf-8')(errors='replace'), True)
+
+        read_bytes = 0
+        rest = ""
+        # The bytes after the last line break read so far, which belong to the unfinished line.
+        rest_bytes = 0
+        has_lines = False
+
+        for block in self._read_blocks(file_path, data):
+            if read_bytes + len(block) > budget:
+                block = block[:budget - read_bytes]
+
+            read_bytes += len(block)
+
+            if read_bytes >= budget and read_bytes < file_size:
+                break
+
+            line_break = max(block.rfind(b'\n'), block.rfind(b'\r'))
+            rest_bytes = rest_bytes + len(block) if line_break < 0 else len(block) - line_break - 1
+
+            text = rest + decoder.decode(block)
+            line_end = text.rfind('\n') + 1
+            rest = text[line_end:]
+
+            if line_end:
+                has_lines = True
+                yield _INVALID_XML_CHARS.sub('\ufffd', text[:line_end])
+        else:
+            text = rest + decoder.decode(b'', final=True)
+
+            if text:
+                yield _INVALID_XML_CHARS.sub('\ufffd', text)
+
+            self.report_bytes += read_bytes
+            return
+
+        self.report_bytes += read_bytes
+        line_break = max(block.rfind(b'\n'), block.rfind(b'\r'))
+
+        if line_break >= 0:
+            shown = rest + decoder.decode(block[:line_break + 1], final=True)
+            shown_bytes = read_bytes - (len(block) - line_break - 1)
+        elif rest_bytes == 0 and rest:
+            # The decoder still holds the '\r' that ended the previous block.
+            shown = rest + decoder.decode(b'', final=True)
+            shown_bytes = read_bytes - len(block)
+        elif not has_lines:
+            shown = rest + decoder.decode(block, final=True)
+            shown_bytes = read_bytes
+        else:
+            shown = ""
+            shown_bytes = read_bytes - len(block) - rest_bytes
+
+        if shown:
+            yield _INVALID_XML_CHARS.sub('\ufffd', shown)
+
+        note = f"[... лістинг скорочено: показано {shown_bytes} з {file_size} байт ...]"
+        yield note if not shown or shown.endswith('\n') else f"\n{note}"
@@ -0,0 +1,37 @@
+import os
+
+from docx.image.image import BaseImageHeader, Image
+
+
+class _ManifestImageHeader(BaseImageHeader):
+    def __init__(self, entry):
+        super().__init__(entry['px_width'], entry['px_height'], entry['horz_dpi'], entry['vert_dpi'])
+        self._content_type = entry['content_type']
+
+    @property
+    def content_type(self):
+        return self._content_type
+
+
+class ManifestImage(Image):
+    """
+    A python-docx image described by a FileManifest entry. The size, type and hash come from the
+    manifest; the file is read only when python-docx needs its bytes to embed it.
+    """
+
+    def __init__(self, image_path, entry):
+        super().__init__(None, os.path.basename(image_path), _ManifestImageHeader(entry))
+        self._path = image_path
+        self._sha1 = entry['sha1']
+
+    @property
+    def blob(self):
+        if self._blob is None:
+            with open(self._path, 'rb') as f:
+                self._blob = f.read()
+
+        return self._blob
+
+    @property
+    def sha1(self):
+        return self._sha1
@@ -0,0 +1,161 @@
+from array import array
+
+# Flags of an item of a nested list.
+STARTS_LIST = 1  # The first item of its list, where the numbering starts.
+OPENS_SUBLIST = 2  # The item is followed by a sublist and ends with a colon.
+ENDS_LIST = 4  # The last item of its list, which ends with a full stop.
+
+# Columns a tab advances the indentation to, so tabs and spaces can be mixed.
+TAB_SIZE = 4
+
+_END = object()
+
+
+class NestedItems:
+    """
+    The items of a nested list in document order, kept in flat arrays: the nesting level of
+    every item (0 for the top list), its text and its flags. The flags are set while the items
+    are collected, so the punctuation and the numbering of an item are known without walking
+    the nesting again, and deep lists need no recursion.
+    """
+
+    __slots__ = ('levels', 'texts', 'flags', 'nested')
+
+    def __init__(self):
+        self.levels = array('H')
+        self.texts = []
+        self.flags = array('B')
+        self.nested = False
+
+    def append(self, level, text, flags=0):
+        self.levels.append(level)
+        self.texts.append(text)
+        self.flags.append(flags)
+
+    def is_flat(self):
+        return not self.nested
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __iter__(self):
+        return zip(self.levels, self.texts, self.flags)
+
+    def numbered(self):
+        """
+        Yields (level, text, flags, number) with the number of every item within its own list,
+        starting from 1.
+        """
+        counters = []
+
+        for level, text, flags in self:
+            if len(counters) <= level:
+                counters.extend([0] * (level + 1 - len(counters)))
+            if flags & STARTS_LIST:
+                counters[level] = 0
+
+            counters[level] += 1
+            yield level, text, flags, counters[level]
+
+
+def punctuate(text, flags):
+    """
+    Ends the text of a list item with a colon before a sublist, a full stop at the end of its
+    list and a semicolon otherwise.
+    """
+    if flags & OPENS_SUBLIST:
+        return text if text.endswith(':') else f"{text.strip(" -–.")}:"
+
+    if flags & ENDS_LIST:
+        return f"{text.strip(" -–.")}."
+
+    return f"{text.strip(" -–.")};"
+
+
+def _get_indent(line):
+    return len(line[:len(line) - len(line.lstrip())].expandtabs(TAB_SIZE))
+
+
+def parse_nested_text(text):
+    """
+    Parses lines indented by nesting level into NestedItems in one pass. A deeper indentation
+    starts a sublist, a shallower one returns to the list it belongs to, or starts a new
+    sublist when no list has exactly that indentation.
+    """
+    items = NestedItems()
+    indents = [0]
+
+    for line in text.strip().splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+
+        indent = _get_indent(line)
+        while indent < indents[-1]:
+            indents.pop()
+
+        flags = 0 if items.texts else STARTS_LIST
+        if indent > indents[-1]:
+            indents.append(indent)
+            flags = STARTS_LIST
+            items.nested = True
+
+        # The previous item is completed now that the position of this one is known.
+        level = len(indents) - 1
+        if items.texts:
+            if level > items.levels[-1]:
+                items.flags[-1] |= OPENS_SUBLIST
+            elif level < items.levels[-1] or flags:
+                items.flags[-1] |= ENDS_LIST
+
+        items.append(level, stripped, flags)
+
+    if items.texts:
+        items.flags[-1] |= ENDS_LIST
+
+    return items
+
+
+def flatten_nested_list(items):
+    """
+    Turns nested Python lists of strings into NestedItems, using a stack instead of recursion.
+    An item before a sublist opens it and the last item of a list ends it.
+    """
+    result = NestedItems()
+    # Per open list: its iterator, its level, whether it has an item yet and the index of its
+    # previous element when that was an item.
+    stack = [[iter(items), 0, False, None]]
+
+    while stack:
+        entry = stack[-1]
+        item = next(entry[0], _END)
+        previous = entry[3]
+        entry[3] = None
+
+        if item is _END:
+            if previous is not None:
+                result.flags[previous] |= ENDS_LIST
+            stack.pop()
+        elif isinstance(item, list):
+            if previous is not None:
+                result.flags[previous] |= OPENS_SUBLIST
+            result.nested = True
+            stack.append([iter(item), entry[1] + 1, False, None])
+        else:
+            entry[3] = len(result)
+            result.append(entry[1], item, 0 if entry[2] else STARTS_LIST)
+            entry[2] = True
+
+    return result
+
+
+def to_nested_items(items):
+    """
+    Accepts NestedItems, indented text or nested lists.
+    """
+    if isinstance(items, NestedItems):
+        return items
+    if isinstance(items, str):
+        return parse_nested_text(items)
+
+    return flatten_nested_list(items)
@@ -0,0 +1,79 @@
+LEVELS = 3
+
+
+class Numbering:
+    """
+    Numbers the headings of a report (section, sub-section, sub-sub-section) and, inside the
+    current heading, every kind of element (image, listing, table) in its own sequence. The
+    number of an element is the number of the deepest heading followed by its counter, e.g.
+    "2.1.3". The heading part of the label is formatted once per heading.
+    """
+
+    def __init__(self, section_number=0):
+        self._headings = [section_number] + [0] * (LEVELS - 1)
+        self._counters = {}
+
+        self._prefix = None
+        self._depth = 0
+
+    def start_heading(self, level):
+        """
+        Starts the next heading of the level (0 for a section) and returns its number. The
+        deeper headings and the element counters of this level and deeper start again.
+        """
+        self._headings[level] += 1
+
+        for deeper_level in range(level + 1, LEVELS):
+            self._headings[deeper_level] = 0
+
+        for counters in self._counters.values():
+            for deeper_level in range(level, LEVELS):
+                counters[deeper_level] = 0
+
+        self._prefix = None
+
+        return ".".join(str(number) for number in self._headings[:level + 1])
+
+    def clear_heading(self, level):
+        """
+        Leaves the heading of the level without a number, as _remove_section_number() does.
+        """
+        self._headings[level] = 0
+        self._prefix = None
+
+    def get_heading(self, level):
+        return self._headings[level]
+
+    def next_label(self, kind):
+        """
+        Counts one more element of the kind in the current heading and returns its number.
+        """
+        if self._prefix is None:
+            if self._headings[1]:
+                self._depth = 2 if self._headings[2] else 1
+            else:
+                self._depth = 0
+
+            self._prefix = ".".join(str(number) for number in self._headings[:self._depth + 1])
+
+        counters = self._counters.get(kind)
+        if counters is None:
+            counters = self._counters[kind] = [0] * LEVELS
+
+        counters[self._depth] += 1
+
+        return f"{self._prefix}.{counters[self._depth]}"
+
+    def snapshot(self):
+        """
+        Returns the whole numbering state as a hashable value, for example to render a part of
+        the report separately and continue from where it ends.
+        """
+        return tuple(self._headings), tuple(sorted((kind, tuple(counters)) for kind, counters in self._counters.items()))
+
+    def restore(self, snapshot):
+        headings, counters = snapshot
+
+        self._headings = list(headings)
+        self._counters = {kind: list(kind_counters) for kind, kind_counters in counters}
+        self._prefix = None
@@ -0,0 +1,359 @@
+import io
+import itertools
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from xml.sax.saxutils import quoteattr
+
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+
+from PracticeWordReportBuilder import SETTINGS_AFTER_UPDATE_FIELDS, WordReportBuilder, run_content_xml, run_xml
+
+_IMAGE_RELATIONSHIP_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/image'
+
+_BUFFER_SIZE = 1 << 16
+
+_SETTINGS_AFTER_UPDATE_FIELDS = re.compile(f"<w:(?:{'|'.join(SETTINGS_AFTER_UPDATE_FIELDS)})[\\s/>]")
+
+
+class OoxmlWordReportBuilder(WordReportBuilder):
+    """
+    Writes word/document.xml straight into the zip file element by element instead of building
+    the python-docx object tree, so memory use is bounded by the largest element. The styled
+    empty document of WordReportBuilder is saved once and provides the remaining package parts,
+    the paragraph properties of every style combination are rendered once and reused.
+
+    Between start_fragment() and end_fragment() the written XML is collected instead, so a
+    section can be cached and later spliced back with add_fragment(). After the table of
+    contents the body goes to a temporary file and is copied after the entries on save().
+
+    The document is written to <filename>.part, which replaces filename on save(). A build that
+    fails before that should call close(), or use the builder as a context manager, so the
+    partial file is removed.
+    """
+
+    # The base document split into the parts this builder needs, prepared by the first builder.
+    _base_package = None
+
+    def __init__(self, filename, section_number=1, image_cache=None, source_list=None, listing_reader=None):
+        super().__init__(filename, section_number, image_cache, source_list, listing_reader)
+
+        self._paragraph_templates = {}
+        self._media = []
+
+        self._temp_filename = f"{filename}.part"
+        self._zip = zipfile.ZipFile(self._temp_filename, 'w', zipfile.ZIP_DEFLATED)
+        self._body = self._zip.open('word/document.xml', 'w', force_zip64=True)
+        self._buffer = []
+        self._buffer_size = 0
+        self._written_size = 0
+        self._fragment = None
+
+        self._write(self._document_head)
+
+    def _open_document(self):
+        """
+        Takes the styles, the package parts and the start and end of document.xml from the base
+        document, which is opened with python-docx only by the first builder in a process.
+        """
+        if OoxmlWordReportBuilder._base_package is None:
+            super()._open_document()
+
+            with zipfile.ZipFile(io.BytesIO(WordReportBuilder._base_document)) as base_zip:
+                parts = {name: base_zip.read(name) for name in base_zip.namelist()}
+
+            document_xml = parts.pop('word/document.xml').decode('utf-8')
+            body_start = document_xml.index('<w:body>') + len('<w:body>')
+            body_end = document_xml.index('<w:sectPr')
+
+            relationships = parts['word/_rels/document.xml.rels'].decode('utf-8')
+
+            OoxmlWordReportBuilder._base_package = {
+                'style_ids': {style.name: style.style_id for style in self.document.styles},
+                'block_width': self._block_width,
+                'parts': parts,
+                'document_head': document_xml[:body_start],
+                'document_tail': document_xml[body_end:],
+                'next_relationship_id': max(int(number) for number in re.findall(r'Id="rId(\d+)"', relationships)) + 1,
+            }
+
+        base_package = OoxmlWordReportBuilder._base_package
+
+        self.document = None
+        self._style_ids = base_package['style_ids']
+        self._table_style_id = self._style_ids['practice_table_style']
+        self._text_style_id = self._style_ids['practice_typical_text_style']
+        self._block_width = base_package['block_width']
+        self._parts = dict(base_package['parts'])
+        self._document_head = base_package['document_head']
+        self._document_tail = base_package['document_tail']
+        self._next_relationship_id = base_package['next_relationship_id']
+
+    def _write(self, xml):
+        self._written_size += len(xml)
+
+        if self._fragment is not None:
+            self._fragment.append(xml)
+            return
+
+        self._buffer.append(xml)
+        self._buffer_size += len(xml)
+
+        if self._buffer_size >= _BUFFER_SIZE:
+            self._flush()
+
+    def _flush(self):
+        self._body.write("".join(self._buffer).encode('utf-8'))
+        self._buffer = []
+        self._buffer_size = 0
+
+    def _paragraph_start(self, style, alignment, left_indent, no_spacing, outline_level=None):
+        key = (style, alignment, left_indent, no_spacing, outline_level)
+        template = self._paragraph_templates.get(key)
+
+        if template is None:
+            properties = []
+
+            if style is not None:
+                properties.append(f'<w:pStyle w:val="{self._style_ids[style]}"/>')
+            if no_spacing:
+                properties.append('<w:spacing w:after="0" w:before="0"/>')
+            if left_indent is not None:
+                properties.append(f'<w:ind w:left="{left_indent.twips}"/>')
+            if alignment is not None:
+                properties.append(f'<w:jc w:val="{alignment.xml_value}"/>')
+            if outline_level is not None:
+                properties.append(f'<w:outlineLvl w:val="{outline_level}"/>')
+
+            template = f"<w:p><w:pPr>{"".join(properties)}</w:pPr>" if properties else "<w:p>"
+            self._paragraph_templates[key] = template
+
+        return template
+
+    def _add_paragraph(self, text="", style='practice_typical_text_style', alignment=None, left_indent=None,
+                       no_spacing=False, outline_level=None):
+        run = run_xml(text) if text else ""
+        self._write(f"{self._paragraph_start(style, alignment, left_indent, no_spacing, outline_level)}{run}</w:p>")
+
+    def _add_image_part(self, loaded_image):
+        if loaded_image.sha1 not in self._images:
+            image = loaded_image.image
+            relationship_id = f"rId{self._next_relationship_id}"
+            self._next_relationship_id += 1
+            part_name = f"word/media/image{len(self._media) + 1}.{image.ext}"
+            self._media.append((relationship_id, part_name, image.content_type, loaded_image.path))
+            self._images[loaded_image.sha1] = relationship_id
+
+        return self._images[loaded_image.sha1]
+
+    def _add_picture(self, loaded_image, width):
+        image = loaded_image.image
+        relationship_id = self._add_image_part(loaded_image)
+        cx, cy = image.scaled_dimensions(width, None)
+
+        self._picture_count += 1
+        shape_id = self._picture_count
+
+        drawing = (
+            '<w:drawing>'
+            '<wp:inline xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+            ' xmlns:pic="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+            f'<wp:extent cx="{cx}" cy="{cy}"/>'
+            f'<wp:docPr id="{shape_id}" name="Picture {shape_id}"/>'
+            '<wp:cNvGraphicFramePr><a:graphicFrameLocks noChangeAspect="1"/></wp:cNvGraphicFramePr>'
+            '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+            f'<pic:pic><pic:nvPicPr><pic:cNvPr id="0" name={quoteattr(image.filename)}/><pic:cNvPicPr/></pic:nvPicPr>'
+            f'<pic:blipFill><a:blip r:embed="{relationship_id}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+            f'<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+            '<a:prstGeom prst="rect"/></pic:spPr></pic:pic>'
+            '</a:graphicData></a:graphic>'
+            '</wp:inline>'
+            '</w:drawing>'
+        )
+
+        paragraph_start = self._paragraph_start('practice_typical_text_style', WD_PARAGRAPH_ALIGNMENT.CENTER, None,
+                                                False)
+        self._write(f"{paragraph_start}<w:r>{drawing}</w:r></w:p>")
+
+    def _add_table(self, data, header_rows=0):
+        for xml in self._table_xml(data, header_rows=header_rows):
+            self._write(xml)
+
+    def _add_code(self, chunks):
+        """
+        Writes the listing chunk by chunk into one run, so only one chunk is in memory. When
+        reading fails midway, the run and the paragraph are still closed before the error
+        propagates, so the document stays well-formed.
+        """
+        paragraph_start = self._paragraph_start('practice_code_style', None, None, False)
+        first_chunk = next(chunks, "")
+
+        if not first_chunk:
+            self._write(f"{paragraph_start}</w:p>")
+            return
+
+        self._write(f"{paragraph_start}<w:r>{run_content_xml(first_chunk)}")
+
+        try:
+            for chunk in chunks:
+                self._write(run_content_xml(chunk))
+        finally:
+            self._write("</w:r></w:p>")
+
+    def add_page_break(self):
+        self._write('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+
+    def _start_table_of_contents(self):
+        self._flush()
+        self._table_of_contents = self._body
+        self._body = tempfile.TemporaryFile()
+
+    def _insert_table_of_contents(self):
+        """
+        Writes the table of contents to document.xml and copies the rest of the body after it,
+        and sets w:updateFields, so Word offers to update the page numbers on every open.
+        """
+        rest = self._body
+        self._body = self._table_of_contents
+
+        self._body.write("".join(self._table_of_contents_xml()).encode('utf-8'))
+        rest.seek(0)
+        shutil.copyfileobj(rest, self._body, _BUFFER_SIZE)
+        rest.close()
+
+        settings = self._parts['word/settings.xml'].decode('utf-8')
+        if '<w:updateFields' in settings:
+            return
+
+        following = _SETTINGS_AFTER_UPDATE_FIELDS.search(settings)
+        position = following.start() if following else settings.rindex('</w:settings>')
+        self._parts['word/settings.xml'] = (
+            f'{settings[:position]}<w:updateFields w:val="true"/>{settings[position:]}'.encode('utf-8'))
+
+    def get_written_size(self):
+        return self._written_size
+
+    def get_state(self):
+        """
+        Returns everything a section depends on besides its own actions: the numbering it
+        continues, the pictures and relationships that are already in the document, the part
+        of the listing budget that is used up and the settings that change how images and
+        listings are rendered.
+        """
+        listing_reader = self.listing_reader
+        settings = (self.IMAGE_WIDTH, self.image_cache.dpi if self.image_cache is not None else None,
+                    listing_reader.max_file_bytes, listing_reader.max_report_bytes,
+                    listing_reader.max_average_line_length)
+
+        return (self.numbering.snapshot(), self._picture_count, self._next_relationship_id, len(self._media),
+                tuple(self._images), listing_reader.report_bytes, settings)
+
+    def start_fragment(self):
+        self._fragment = []
+        self._fragment_headings_start = len(self._headings)
+        self._fragment_media_start = len(self._media)
+        self._fragment_images_start = len(self._images)
+        self._fragment_listing_bytes_start = self.listing_reader.report_bytes
+
+    def end_fragment(self):
+        """
+        Stops collecting, writes the collected XML to the document and returns it as a fragment
+        with the images it added, the numbering it ends with and the listing bytes it used.
+        """
+        xml = "".join(self._fragment)
+        self._fragment = None
+        self._buffer.append(xml)
+        self._flush()
+
+        return {
+            'xml': xml,
+            'media': self._media[self._fragment_media_start:],
+            'images': list(itertools.islice(self._images.items(), self._fragment_images_start, None)),
+            'numbering': self.numbering.snapshot(),
+            'headings': self._headings[self._fragment_headings_start:],
+            'listing_bytes': self.listing_reader.report_bytes - self._fragment_listing_bytes_start,
+            'picture_count': self._picture_count,
+            'next_relationship_id': self._next_relationship_id,
+        }
+
+    def add_fragment(self, fragment):
+        """
+        Writes a fragment returned by end_fragment() as if its section had been rendered again.
+        """
+        self._write(fragment['xml'])
+        self._media.extend(fragment['media'])
+        self._images.update(fragment['images'])
+        self._headings.extend(fragment['headings'])
+        self.listing_reader.report_bytes += fragment['listing_bytes']
+
+        self.numbering.restore(fragment['numbering'])
+
+        self._picture_count = fragment['picture_count']
+        self._next_relationship_id = fragment['next_relationship_id']
+
+    def _write_package(self):
+        content_types = self._parts['[Content_Types].xml'].decode('utf-8')
+        relationships = self._parts['word/_rels/document.xml.rels'].decode('utf-8')
+
+        for relationship_id, part_name, content_type, image_path in self._media:
+            extension = part_name.rsplit('.', 1)[1]
+
+            if f'Extension="{extension}"' not in content_types:
+                content_types = content_types.replace(
+                    '</Types>', f'<Default Extension="{extension}" ContentType="{content_type}"/></Types>')
+
+            relationships = relationships.replace(
+                '</Relationships>',
+                f'<Relationship Id="{relationship_id}" Type="{_IMAGE_RELATIONSHIP_TYPE}"'
+                f' Target="{part_name[len("word/"):]}"/></Relationships>')
+
+            self._zip.write(image_path, part_name)
+
+        self._parts['[Content_Types].xml'] = content_types.encode('utf-8')
+        self._parts['word/_rels/document.xml.rels'] = relationships.encode('utf-8')
+
+        for name, data in self._parts.items():
+            self._zip.writestr(name, data)
+
+    def _save_document(self):
+        self._write(self._document_tail)
+        self._flush()
+
+        if self._table_of_contents is not None:
+            self._insert_table_of_contents()
+
+        self._body.close()
+
+        self._write_package()
+        self._zip.close()
+        self._zip = None
+
+        os.replace(self._temp_filename, self.filename)
+
+    def close(self):
+        """
+        Abandons a document that was not saved: closes the partial file and removes it. Does
+        nothing after save().
+        """
+        if self._zip is None:
+            return
+
+        for body in (self._body, self._table_of_contents):
+            if body is not None:
+                body.close()
+
+        self._zip.close()
+        self._zip = None
+
+        try:
+            os.remove(self._temp_filename)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
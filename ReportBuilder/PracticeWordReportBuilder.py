@@ -1,61 +1,120 @@
 from docx import Document
-from docx.oxml import OxmlElement
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml import OxmlElement, parse_xml
+from docx.oxml.shape import CT_Inline
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT, WD_BREAK
-from docx.shared import Pt, Cm
+from docx.shared import Pt, Cm, Emu
 from functools import wraps
-from docx.oxml.ns import qn
+from docx.oxml.ns import qn, nsdecls
 from docx.enum.table import WD_ALIGN_VERTICAL
+from ImageLoader import find_image, load_image
+from ListingReader import ListingReader
+from NestedText import punctuate, to_nested_items
+from Numbering import Numbering
 from TextCleaner import TextCleaner
+import io
+import itertools
 import os
 import re
-from config import *
-
-
-def parse_nested_text(text):
-    text = text.strip()
-    lines = text.splitlines()
-    stack = [(0, [])]
-
-    for line in lines:
-        stripped = line.strip()
-        if not stripped:
-            continue
+import config
+from xml.sax.saxutils import escape
+
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+_RUN_SPECIAL_CHARS = re.compile('([\t\r\n])')
+
+# The elements of w:settings that come after w:updateFields in the schema, so the setting is
+# inserted before the first of them that a template has, or at the end when it has none.
+SETTINGS_AFTER_UPDATE_FIELDS = (
+    'hdrShapeDefaults', 'footnotePr', 'endnotePr', 'compat', 'docVars', 'rsids', 'mathPr', 'attachedSchema',
+    'themeFontLang', 'clrSchemeMapping', 'doNotIncludeSubdocsInStats', 'doNotAutoCompressPictures', 'forceUpgrade',
+    'captions', 'readModeInkLockDown', 'smartTagType', 'schemaLibrary', 'shapeDefaults', 'doNotEmbedSmartTags',
+    'decimalSymbol', 'listSeparator',
+)
+
+
+def run_xml(text, properties=""):
+    """
+    Renders text as a w:r element the same way python-docx does: tabs become w:tab, line
+    breaks become w:br and everything else goes into w:t elements.
+    """
+    return f"<w:r>{properties}{run_content_xml(text)}</w:r>"
+
+
+def run_content_xml(text):
+    """
+    Renders the content of a w:r element for the text. Text split at line breaks can be
+    rendered piece by piece with the same result.
+    """
+    if _INVALID_XML_CHARS.search(text):
+        raise ValueError("All strings must be XML compatible: Unicode or ASCII, no NULL bytes or control characters")
+
+    parts = []
+
+    for chunk in _RUN_SPECIAL_CHARS.split(text):
+        if chunk == '\t':
+            parts.append("<w:tab/>")
+        elif chunk in ('\r', '\n'):
+            parts.append("<w:br/>")
+        elif chunk:
+            if len(chunk.strip()) < len(chunk):
+                parts.append(f'<w:t xml:space="preserve">{escape(chunk)}</w:t>')
+            else:
+                parts.append(f"<w:t>{escape(chunk)}</w:t>")
 
-        indent = len(line) - len(line.lstrip())
-        while stack and indent < stack[-1][0]:
-            stack.pop()
+    return "".join(parts)
 
-        if indent == stack[-1][0]:
-            stack[-1][1].append(stripped)
-        else:
-            new_list = [stripped]
-            stack[-1][1].append(new_list)
-            stack.append((indent, new_list))
 
-    return stack[0][1]
+class WordReportBuilder:
+    IMAGE_WIDTH = Cm(10)
 
+    # The empty document with the custom styles as docx bytes, saved by the first builder.
+    _base_document = None
 
-class WordReportBuilder:
-    def __init__(self, filename, section_number=1):
+    def __init__(self, filename, section_number=1, image_cache=None, source_list=None, listing_reader=None):
         self.filename = filename
-        self.document = Document()
-        self._create_custom_styles()
-
-        self.section_number = section_number - 1
-        self.sub_section_number = 0
-        self.sub_sub_section_number = 0
+        self.image_cache = image_cache
+        self.listing_reader = listing_reader if listing_reader is not None else ListingReader()
+        self.source_list = source_list if source_list is not None else config.source_list
+        self._open_document()
+
+        self._images = {}
+        self._picture_count = 0
+
+        self.numbering = Numbering(section_number - 1)
+
+        # The (level, text) of every heading in order, for the table of contents.
+        self._headings = []
+        # Where the table of contents is inserted on save(), once all headings are known.
+        self._table_of_contents = None
+
+    def _open_document(self):
+        """
+        The first builder in a process creates the custom styles and keeps the styled empty
+        document as bytes, the following builders open a copy of it instead of creating the
+        styles again.
+        """
+        if WordReportBuilder._base_document is None:
+            self.document = Document()
+            self._create_custom_styles()
+
+            base = io.BytesIO()
+            self.document.save(base)
+            WordReportBuilder._base_document = base.getvalue()
+        else:
+            self.document = Document(io.BytesIO(WordReportBuilder._base_document))
 
-        self.section_listing_number = 0
-        self.sub_section_listing_number = 0
-        self.sub_sub_section_listing_number = 0
+            styles = self.document.styles
+            self.typical_text_style = styles['practice_typical_text_style']
+            self.empty_line_style = styles['practice_empty_line_style']
+            self.practice_section_style = styles['practice_section_style_center']
+            self.practice_code_style = styles['practice_code_style']
+            self.practice_table_style = styles['practice_table_style']
 
-        self.section_image_number = 0
-        self.sub_section_image_number = 0
-        self.sub_sub_section_image_number = 0
+        self._table_style_id = self.practice_table_style.style_id
+        self._text_style_id = self.typical_text_style.style_id
 
-        self.section_table_number = 0
-        self.sub_section_table_number = 0
-        self.sub_sub_section_table_number = 0
+        section = self.document.sections[-1]
+        self._block_width = section.page_width - section.left_margin - section.right_margin
 
     def _create_custom_styles(self):
         styles = self.document.styles
@@ -106,61 +165,160 @@ class WordReportBuilder:
         self.practice_code_style.paragraph_format.space_before = Pt(0)
         self.practice_code_style.paragraph_format.space_after = Pt(0)
 
+        self.practice_table_style = styles.add_style('practice_table_style', 3)
+        self.practice_table_style.font.name = 'Times New Roman'
+        self.practice_table_style.font.size = Pt(12)
+        self.practice_table_style.paragraph_format.line_spacing = 1
+        self.practice_table_style.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+        self.practice_table_style.paragraph_format.space_before = Pt(0)
+        self.practice_table_style.paragraph_format.space_after = Pt(0)
+
+        cell_properties = OxmlElement('w:tcPr')
+        vertical_alignment = OxmlElement('w:vAlign')
+        vertical_alignment.set(qn('w:val'), 'center')
+        cell_properties.append(vertical_alignment)
+        self.practice_table_style.element.append(cell_properties)
+
+    def _add_paragraph(self, text="", style='practice_typical_text_style', alignment=None, left_indent=None,
+                       no_spacing=False, outline_level=None):
+        paragraph = self.document.add_paragraph(text, style=style)
+
+        if alignment is not None:
+            paragraph.alignment = alignment
+        if left_indent is not None:
+            paragraph.paragraph_format.left_indent = left_indent
+        if no_spacing:
+            paragraph.paragraph_format.space_after = Pt(0)
+            paragraph.paragraph_format.space_before = Pt(0)
+        if outline_level is not None:
+            outline = OxmlElement('w:outlineLvl')
+            outline.set(qn('w:val'), str(outline_level))
+            paragraph._p.get_or_add_pPr().append(outline)
+
+        return paragraph
+
+    def _add_heading(self, text, level, style):
+        """
+        Adds a heading paragraph with the outline level Word builds the table of contents from,
+        and remembers it for the prefilled entries.
+        """
+        self._headings.append((level, text))
+        self._add_paragraph(text, style=style, outline_level=level)
+
+    def _insert_picture(self, run, loaded_image, width):
+        """
+        Does what run.add_picture() does, but finds a previously added copy of the image by the
+        precomputed hash instead of rehashing every image part. This is the only place that uses
+        the python-docx internals behind add_picture().
+        """
+        part = self.document.part
+        image_part = self._images.get(loaded_image.sha1)
+
+        if image_part is None:
+            image_part = part.package.image_parts._add_image_part(loaded_image.image)
+            self._images[loaded_image.sha1] = image_part
+
+        relationship_id = part.relate_to(image_part, RT.IMAGE)
+        image = image_part.image
+        cx, cy = image.scaled_dimensions(width, None)
+
+        self._picture_count += 1
+        inline = CT_Inline.new_pic_inline(self._picture_count, relationship_id, image.filename, cx, cy)
+
+        run._r.add_drawing(inline)
+
+    def _add_picture(self, loaded_image, width):
+        paragraph = self._add_paragraph(alignment=WD_PARAGRAPH_ALIGNMENT.CENTER)
+        self._insert_picture(paragraph.add_run(), loaded_image, width)
+
+    def _table_xml(self, data, namespaces="", header_rows=0):
+        """
+        Yields the XML of a w:tbl element piece by piece: the table header, then one row at a time.
+        data can be any iterable of rows, which is consumed as the rows are yielded; the first
+        row sets the number of columns. The first header_rows rows are repeated at the top of
+        every page. Paragraph, font and cell alignment come from practice_table_style, so cells
+        only carry their width and text. namespaces is added to w:tbl when the XML is parsed on
+        its own.
+        """
+        rows = iter(data)
+        first_row = next(rows, None)
+        if first_row is None:
+            return
+
+        max_columns = len(first_row)
+        column_width = Emu(self._block_width // max_columns).twips
+        style_id = self._table_style_id
+
+        yield (f'<w:tbl{namespaces}><w:tblPr><w:tblStyle w:val="{style_id}"/><w:tblW w:type="auto" w:w="0"/>'
+               '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0"'
+               ' w:noHBand="0" w:noVBand="1" w:val="04A0"/></w:tblPr>'
+               f'<w:tblGrid>{f'<w:gridCol w:w="{column_width}"/>' * max_columns}</w:tblGrid>')
+
+        cell_start = f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{column_width}"/></w:tcPr><w:p>'
+
+        for i, row in enumerate(itertools.chain([first_row], rows)):
+            cells = []
+
+            for j in range(max_columns):
+                text = str(row[j]) if j < len(row) else ""
+                cells.append(f"{cell_start}{run_xml(text) if text else ''}</w:p></w:tc>")
+
+            row_start = "<w:tr><w:trPr><w:tblHeader/></w:trPr>" if i < header_rows else "<w:tr>"
+            yield f"{row_start}{"".join(cells)}</w:tr>"
+
+        yield "</w:tbl>"
+
+    # How many table rows are parsed into the python-docx tree at once.
+    _TABLE_BATCH_ROWS = 1000
+
+    def _add_table(self, data, header_rows=0):
+        """
+        Builds the table from the XML of _table_xml() in batches of rows, so the rows are never
+        all held as text at once.
+        """
+        pieces = self._table_xml(data, f" {nsdecls('w')}", header_rows)
+        start = next(pieces, None)
+        if start is None:
+            return
+
+        table = parse_xml(f"{start}</w:tbl>")
+        self.document.element.body._insert_tbl(table)
+
+        for batch in itertools.batched(pieces, self._TABLE_BATCH_ROWS):
+            rows_xml = "".join(batch).removesuffix("</w:tbl>")
+            table.extend(parse_xml(f"<w:tbl {nsdecls('w')}>{rows_xml}</w:tbl>"))
+
     def _add_empty_line(self):
-        self.document.add_paragraph(style='practice_empty_line_style')
+        self._add_paragraph(style='practice_empty_line_style')
 
     def _remove_section_number(self):
-        self.section_number = 0
+        self.numbering.clear_heading(0)
 
     def _remove_sub_section_number(self):
-        self.sub_section_number = 0
+        self.numbering.clear_heading(1)
 
     def _remove_sub_sub_section_number(self):
-        self.sub_sub_section_number = 0
+        self.numbering.clear_heading(2)
 
     def add_page_break(self):
         self.document.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
 
     def add_section(self, text):
-        self.section_number += 1
-        self.sub_section_number = 0
-        self.sub_sub_section_number = 0
-
-        self.section_image_number = 0
-        self.sub_section_image_number = 0
-        self.sub_sub_section_image_number = 0
-
-        self.section_table_number = 0
-        self.sub_section_table_number = 0
-        self.sub_sub_section_table_number = 0
+        section_number = self.numbering.start_heading(0)
 
         self.add_page_break()
 
-        self.document.add_paragraph(f"{self.section_number} " + text, style='practice_section_style')
+        self._add_heading(f"{section_number} " + text, 0, 'practice_section_style')
 
     def add_sub_section(self, text):
-        self.sub_section_number += 1
-        self.sub_sub_section_number = 0
+        sub_section_number = self.numbering.start_heading(1)
 
-        self.sub_section_image_number = 0
-        self.sub_sub_section_image_number = 0
-
-        self.sub_section_table_number = 0
-        self.sub_sub_section_table_number = 0
-
-        self.document.add_paragraph(f"{self.section_number}.{self.sub_section_number} " + text,
-                                    style='practice_typical_text_style')
+        self._add_heading(f"{sub_section_number} " + text, 1, 'practice_typical_text_style')
 
     def add_sub_sub_section(self, text):
-        self.sub_sub_section_number += 1
-
-        self.sub_sub_section_image_number = 0
-
-        self.sub_sub_section_table_number = 0
+        sub_sub_section_number = self.numbering.start_heading(2)
 
-        self.document.add_paragraph(
-            f"{self.section_number}.{self.sub_section_number}.{self.sub_sub_section_number} " + text,
-            style='practice_typical_text_style')
+        self._add_heading(f"{sub_sub_section_number} " + text, 2, 'practice_typical_text_style')
 
     def add_text(self, text):
         text = text.strip()
@@ -173,158 +331,131 @@ class WordReportBuilder:
                 if not line.endswith('.'):
                     line += '.'
 
-                self.document.add_paragraph(line, style='practice_typical_text_style')
+                self._add_paragraph(line, style='practice_typical_text_style')
 
-    def _add_list_of_level(self, description, items, level=1):
-        def is_flat_list(items):
-            return all(not isinstance(item, list) for item in items)
-
-        self.document.add_paragraph(description, style='practice_typical_text_style')
-
-        if is_flat_list(items):
-            for item in items:
-                para = self.document.add_paragraph(style='practice_typical_text_style')
-                para.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
-                para.paragraph_format.left_indent = Cm(0)
-                para.add_run(f"– {item.strip(" -–").lower()}")
-                para.paragraph_format.space_after = Pt(0)
-                para.paragraph_format.space_before = Pt(0)
-        else:
-            LEVEL_STYLES = [
-                lambda i: f"{chr(1072 + i % 32)})",  # Укр буквы: а, б, в, ...
-                lambda i: f"{i + 1})",  # Арабские цифры: 1, 2, 3, ...
-                lambda i: "–"
-            ]
-            NUM_LEVELS = len(LEVEL_STYLES)
-
-            def add_sublist(items, current_level):
-                style_func = LEVEL_STYLES[(current_level - 1) % NUM_LEVELS]
-                counter = 0
-
-                for item in items:
-                    if isinstance(item, list):
-                        add_sublist(item, current_level + 1)
-                    else:
-                        if item.strip():
-                            para = self.document.add_paragraph(style='practice_typical_text_style')
-                            para.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
-                            para.paragraph_format.left_indent = Cm((current_level - 1) * 1)
-                            counter += 1
-                            prefix = style_func(counter - 1)
-
-                            if prefix == "–":
-                                para.add_run(f"{prefix} {item.strip(" -–").lower()}")
-                            else:
-                                para.add_run(f"{prefix} {item.strip(" -–").lower()}")
-
-                            para.paragraph_format.space_after = Pt(0)
-                            para.paragraph_format.space_before = Pt(0)
-
-            add_sublist(items, level)
+    # Markers of the items of nested lists by level: Ukrainian letters, numbers and dashes, repeated.
+    _LIST_LEVEL_MARKERS = (
+        lambda number: f"{chr(1072 + (number - 1) % 32)})",
+        lambda number: f"{number})",
+        lambda number: "–",
+    )
 
     def add_list(self, description, items):
+        """
+        items are NestedItems, indented text or nested lists. A flat list is marked with dashes,
+        the levels of a nested one with _LIST_LEVEL_MARKERS; the items end with a colon before a
+        sublist, a full stop at the end of a list and a semicolon otherwise.
+        """
         if not description.endswith(':'):
             description += ':'
 
-        def add_colon_and_punctuation(items):
-            result = []
-            for i in range(len(items)):
-                item = items[i]
-
-                has_sublist = isinstance(item, list)
-
-                if isinstance(item, str):
-                    if i < len(items) - 1 and isinstance(items[i + 1], list):
-                        if not item.endswith(':'):
-                            result.append(f"{item.strip(" -–.")}:")
-                        else:
-                            result.append(item)
-                    elif i < len(items) - 1 and isinstance(items[i + 1], str):
-                        result.append(f"{item.strip(" -–.")};")
-                    elif i == len(items) - 1:
-                        result.append(f"{item.strip(" -–.")}.")
-                    else:
-                        result.append(item)
-
-                elif isinstance(item, list):
-                    if result and not isinstance(result[-1], list):
-                        if not result[-1].endswith(':'):
-                            result[-1] += ":"
-                    result.append(add_colon_and_punctuation(item))
-
-            return result
-
-        if isinstance(items, str):
-            items = parse_nested_text(items)
-
-        items_with_colons_and_punctuation = add_colon_and_punctuation(items)
-
-        self._add_list_of_level(description, items_with_colons_and_punctuation)
-
-    def _add_numbered_list_of_level(self, description, items, level=1):
-        def is_flat_list(items):
-            return all(not isinstance(item, list) for item in items)
-
-        self.document.add_paragraph(description, style='practice_typical_text_style')
-
-        if is_flat_list(items):
-            for index, item in enumerate(items, start=1):
-                para = self.document.add_paragraph(style='practice_typical_text_style')
-                para.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
-                para.paragraph_format.left_indent = Cm(0)
-                para.add_run(f"{index}) {item}")
-                para.paragraph_format.space_after = Pt(0)
-                para.paragraph_format.space_before = Pt(0)
-        else:
-            def add_sublist(items, current_level):
-                counter = 0
-                for item in items:
-                    if isinstance(item, list):
-                        add_sublist(item, current_level + 1)
-                    else:
-                        counter += 1
-                        para = self.document.add_paragraph(style='practice_typical_text_style')
-                        para.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
-                        para.paragraph_format.left_indent = Cm((current_level - 1) * 1)
-                        para.add_run(f"{counter}. {item}")
-                        para.paragraph_format.space_after = Pt(0)
-                        para.paragraph_format.space_before = Pt(0)
-
-            add_sublist(items, level)
+        items = to_nested_items(items)
+        is_flat = items.is_flat()
+
+        self._add_paragraph(description, style='practice_typical_text_style')
+
+        for level, text, flags, number in items.numbered():
+            marker = "–" if is_flat else self._LIST_LEVEL_MARKERS[level % len(self._LIST_LEVEL_MARKERS)](number)
+
+            self._add_paragraph(f"{marker} {punctuate(text, flags).strip(" -–").lower()}",
+                                style='practice_typical_text_style', alignment=WD_PARAGRAPH_ALIGNMENT.LEFT,
+                                left_indent=Cm(level), no_spacing=True)
 
     def add_numbered_list(self, description, items):
         if not description.endswith(':'):
             description += ':'
 
-        self._add_numbered_list_of_level(description, items)
+        items = to_nested_items(items)
+        is_flat = items.is_flat()
+
+        self._add_paragraph(description, style='practice_typical_text_style')
+
+        for level, text, flags, number in items.numbered():
+            self._add_paragraph(f"{number}) {text}" if is_flat else f"{number}. {text}",
+                                style='practice_typical_text_style', alignment=WD_PARAGRAPH_ALIGNMENT.LEFT,
+                                left_indent=Cm(level), no_spacing=True)
 
     def add_introduction(self, text):
         self.add_page_break()
-        self.document.add_paragraph(f"ВСТУП", style='practice_section_style_center')
+        self._add_heading("ВСТУП", 0, 'practice_section_style_center')
         self._add_empty_line()
         self.add_text(text)
 
     def add_source_list(self):
         self.add_page_break()
-        self.document.add_paragraph(f"СПИСОК ВИКОРИСТАНИХ ДЖЕРЕЛ", style='practice_section_style_center')
+        self._add_heading("СПИСОК ВИКОРИСТАНИХ ДЖЕРЕЛ", 0, 'practice_section_style_center')
         self._add_empty_line()
 
-        global source_list
+        for number, text in self.source_list.get_sources().items():
+            self._add_paragraph(f"{number}. {text}", style='practice_typical_text_style',
+                                alignment=WD_PARAGRAPH_ALIGNMENT.LEFT, no_spacing=True)
+
+        self.add_page_break()
 
-        for number, text in source_list.get_sources().items():
-            para = self.document.add_paragraph(style='practice_typical_text_style')
-            self.empty_line_style.paragraph_format.first_line_indent = Cm(1.25)
-            para.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
-            para.paragraph_format.space_after = Pt(0)
-            para.paragraph_format.space_before = Pt(0)
-            para.add_run(f"{number}. {text}")
+    def add_table_of_contents(self):
+        """
+        Adds the contents page here. Its entries are inserted on save(), when all headings are
+        known, in one piece.
+        """
+        if self._table_of_contents is not None:
+            raise ValueError("Зміст уже додано")
 
         self.add_page_break()
+        self._add_paragraph("ЗМІСТ", style='practice_section_style_center')
+        self._add_empty_line()
+        self._start_table_of_contents()
+
+    def _start_table_of_contents(self):
+        self._table_of_contents = self.document.add_paragraph()._p
+
+    def _table_of_contents_xml(self):
+        """
+        Yields the XML of a TOC field over the outline levels of the headings. Word fills in the
+        page numbers when it updates the field, until then the field shows the prefilled
+        entries with the heading texts.
+        """
+        field_start = ('<w:r><w:fldChar w:fldCharType="begin"/></w:r>'
+                       '<w:r><w:instrText xml:space="preserve"> TOC \\o "1-3" \\h \\z \\u </w:instrText></w:r>'
+                       '<w:r><w:fldChar w:fldCharType="separate"/></w:r>')
+        left = WD_PARAGRAPH_ALIGNMENT.LEFT.xml_value
+
+        for level, text in self._headings or [(0, "")]:
+            yield (f'<w:p><w:pPr><w:pStyle w:val="{self._text_style_id}"/><w:spacing w:after="0" w:before="0"/>'
+                   f'<w:ind w:left="{Cm(0.5 * level).twips}" w:firstLine="0"/><w:jc w:val="{left}"/></w:pPr>'
+                   f'{field_start}{run_xml(text) if text else ""}</w:p>')
+            field_start = ""
+
+        yield '<w:p><w:r><w:fldChar w:fldCharType="end"/></w:r></w:p>'
+
+    def _insert_table_of_contents(self):
+        """
+        Puts the entries in place of the placeholder and sets w:updateFields, so Word offers to
+        update the page numbers. Word asks this every time the document is opened.
+        """
+        body = parse_xml(f'<w:body {nsdecls("w")}>{"".join(self._table_of_contents_xml())}</w:body>')
+
+        for element in list(body):
+            self._table_of_contents.addprevious(element)
+
+        self._table_of_contents.getparent().remove(self._table_of_contents)
+
+        settings = self.document.settings.element
+        if settings.find(qn('w:updateFields')) is not None:
+            return
+
+        update_fields = OxmlElement('w:updateFields')
+        update_fields.set(qn('w:val'), 'true')
+        following_tags = {qn(f'w:{name}') for name in SETTINGS_AFTER_UPDATE_FIELDS}
+        following = next((element for element in settings if element.tag in following_tags), None)
+
+        if following is not None:
+            following.addprevious(update_fields)
+        else:
+            settings.append(update_fields)
 
-    def add_image(self, image_path, description):
-        if not os.path.exists(image_path):
-            base_name = os.path.basename(image_path)
-            image_path = os.path.join('Images', base_name)
+    def add_image(self, image_path, description, loaded_image=None):
+        if loaded_image is None:
+            image_path = find_image(image_path)
 
             if not os.path.exists(image_path):
                 raise FileNotFoundError(f"Image not found: {image_path} or in 'Images' directory")
@@ -334,117 +465,78 @@ class WordReportBuilder:
         self.add_text(f"{description} зображено на рисунку {current_image_number}.")
         self._add_empty_line()
 
-        paragraph = self.document.add_paragraph(style='practice_typical_text_style')
-        paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        paragraph.add_run().add_picture(image_path, width=Cm(10))
+        if loaded_image is None:
+            if self.image_cache is not None:
+                image_path = self.image_cache.prepare(image_path, self.IMAGE_WIDTH)
+
+            loaded_image = load_image(image_path)
+
+        self._add_picture(loaded_image, self.IMAGE_WIDTH)
 
         result_description = f"Рисунок {current_image_number} – {description}"
-        paragraph = self.document.add_paragraph(result_description, style='practice_typical_text_style')
-        paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+        self._add_paragraph(result_description, style='practice_typical_text_style',
+                            alignment=WD_PARAGRAPH_ALIGNMENT.CENTER)
 
-    def add_listing(self, file_path):
+    def _add_code(self, chunks):
+        self._add_paragraph("".join(chunks), style='practice_code_style')
+
+    def add_listing(self, file_path, data=None):
         try:
             file_name = os.path.basename(file_path)
 
-            with open(file_path, 'r', encoding='utf-8') as f:
-                code = f.read()
+            skip_reason = self.listing_reader.check(file_path, data)
+            if skip_reason is not None:
+                print(f"Файл {file_path} пропущен: {skip_reason}")
+                return
 
             listing_number = self.get_current_listing_number()
 
             self.add_text(f"Вміст файлу {file_name} відображено у листингу {listing_number}.")
             self._add_empty_line()
-            self.document.add_paragraph(f"Лістинг {listing_number} – Вміст {file_name}",
-                                        style='practice_typical_text_style')
-            self.document.add_paragraph(code, style='practice_code_style')
+            self._add_paragraph(f"Лістинг {listing_number} – Вміст {file_name}",
+                                style='practice_typical_text_style')
+            self._add_code(self.listing_reader.read(file_path, data))
 
         except Exception as e:
             print(f"Ошибка при обработке файла {file_path}: {e}")
 
-    def add_table(self, description, data, current_table_number):
+    def add_table(self, description, data, current_table_number, header_rows=0):
         result_description = "Тблиця " + current_table_number + " – " + description
-        self.document.add_paragraph(f"{result_description}", style='practice_typical_text_style')
-
-        max_columns = len(data[0])
+        self._add_paragraph(f"{result_description}", style='practice_typical_text_style')
 
-        table = self.document.add_table(rows=len(data), cols=len(data[0]))
-
-        for i, row in enumerate(data):
-            for j in range(max_columns):
-                if j < len(row):
-                    table.cell(i, j).text = str(row[j])
-                else:
-                    table.cell(i, j).text = ""
+        self._add_table(data, header_rows)
 
-                for paragraph in table.cell(i, j).paragraphs:
-                    paragraph.paragraph_format.line_spacing = 1
-                    paragraph.paragraph_format.space_before = Pt(0)
-                    paragraph.paragraph_format.space_after = Pt(0)
+    def get_written_size(self):
+        """
+        Returns how many characters of document XML have been written so far, or None when the
+        backend keeps the document in memory until it is saved, as python-docx does.
+        """
+        return None
 
-                    paragraph.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+    def _save_document(self):
+        if self._table_of_contents is not None:
+            self._insert_table_of_contents()
 
-                    table.cell(i, j).vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-
-                    for run in paragraph.runs:
-                        run.font.size = Pt(12)
-                        run.font.name = 'Times New Roman'
+        self.document.save(self.filename)
 
     def save(self):
-        self.document.save(self.filename)
+        self._save_document()
         print(f"Document saved: {self.filename}")
 
-    def get_current_image_number(self):
-        result_number = f"{self.section_number}"
-
-        if self.sub_section_number:
-            result_number += f".{self.sub_section_number}"
+        if self.image_cache is not None:
+            print(f"Images downscaled: {self.image_cache.saved_bytes} bytes saved")
 
-            if self.sub_sub_section_number:
-                result_number += f".{self.sub_sub_section_number}"
-                self.sub_sub_section_image_number += 1
-                result_number += f".{self.sub_sub_section_image_number}"
-            else:
-                self.sub_section_image_number += 1
-                result_number += f".{self.sub_section_image_number}"
-        else:
-            self.section_image_number += 1
-            result_number += f".{self.section_image_number}"
+    def close(self):
+        """
+        Abandons a document that was not saved. The document is only written by save(), so
+        there is nothing to clean up here.
+        """
 
-        return result_number
+    def get_current_image_number(self):
+        return self.numbering.next_label('image')
 
     def get_current_listing_number(self):
-        result_number = f"{self.section_number}"
-
-        if self.sub_section_number:
-            result_number += f".{self.sub_section_number}"
-
-            if self.sub_sub_section_number:
-                result_number += f".{self.sub_sub_section_number}"
-                self.sub_sub_section_listing_number += 1
-                result_number += f".{self.sub_sub_section_listing_number}"
-            else:
-                self.sub_section_listing_number += 1
-                result_number += f".{self.sub_section_listing_number}"
-        else:
-            self.section_listing_number += 1
-            result_number += f".{self.section_listing_number}"
-
-        return result_number
+        return self.numbering.next_label('listing')
 
     def get_current_table_number(self):
-        result_number = f"{self.section_number}"
-
-        if self.sub_section_number:
-            result_number += f".{self.sub_section_number}"
-
-            if self.sub_sub_section_number:
-                result_number += f".{self.sub_sub_section_number}"
-                self.sub_sub_section_image_number += 1
-                result_number += f".{self.sub_sub_section_image_number}"
-            else:
-                self.sub_section_image_number += 1
-                result_number += f".{self.sub_section_image_number}"
-        else:
-            self.section_image_number += 1
-            result_number += f".{self.section_image_number}"
-
-        return result_number
+        return self.numbering.next_label('table')
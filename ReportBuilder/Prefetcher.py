@@ -0,0 +1,90 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Prefetcher:
+    """
+    Reads the files of upcoming images and listings in background threads while the actions
+    before them are rendered, so rendering and disk reads overlap. At most window actions
+    ahead are read, and at most max_bytes of file data are waiting to be rendered at a time;
+    a single larger file is still read when nothing else is waiting.
+    """
+
+    def __init__(self, image_loader, listing_reader, image_width, window=16, max_bytes=32 << 20, workers=2):
+        self.image_loader = image_loader
+        self.listing_reader = listing_reader
+        self.image_width = image_width
+        self.window = window
+        self.max_bytes = max_bytes
+        self.workers = workers
+
+        self._executor = None
+
+    def _get_size(self, action):
+        """
+        Returns how many bytes prefetching the action reads, or None when there is nothing to read.
+        """
+        method_name, args, kwargs = action
+
+        if method_name == 'add_image' and 'loaded_image' not in kwargs:
+            max_size = None
+        elif method_name == 'add_listing' and 'data' not in kwargs:
+            # Once the listings fill the report budget, the remaining ones are left out unread.
+            if self.listing_reader.report_bytes >= self.listing_reader.max_report_bytes:
+                return None
+            max_size = self.listing_reader.max_file_bytes
+        else:
+            return None
+
+        if not os.path.isfile(args[0]):
+            return None
+
+        size = os.path.getsize(args[0])
+        return size if max_size is None else min(size, max_size)
+
+    def _submit(self, action):
+        method_name, args, kwargs = action
+
+        if method_name == 'add_image':
+            return method_name, args, dict(kwargs, loaded_image=self.image_loader.submit(args[0], self.image_width))
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        return method_name, args, dict(kwargs, data=self._executor.submit(self.listing_reader.prefetch, args[0]))
+
+    def prefetch(self, actions):
+        """
+        Yields the actions in order, with the files of the actions ahead already being read.
+        """
+        actions = list(actions)
+        waiting = deque()
+        waiting_bytes = 0
+        next_index = 0
+
+        for index in range(len(actions)):
+            while waiting and waiting[0][0] < index:
+                waiting_bytes -= waiting.popleft()[1]
+
+            while next_index < len(actions) and next_index <= index + self.window:
+                size = self._get_size(actions[next_index])
+
+                if size is not None:
+                    if waiting and waiting_bytes + size > self.max_bytes:
+                        break
+
+                    actions[next_index] = self._submit(actions[next_index])
+                    waiting.append((next_index, size))
+                    waiting_bytes += size
+
+                next_index += 1
+
+            yield actions[index]
+            # The rendered action drops its file data, so only the data waiting ahead is held.
+            actions[index] = None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -1,20 +1,117 @@
+import itertools
 import os
+from collections import deque
+from concurrent.futures import Future
+from contextlib import nullcontext
 from functools import wraps
 
-from PracticeWordReportBuilder import WordReportBuilder
+import config
+from CsvTable import CsvTable
+from CrossReferences import REFERENCE_PATTERN, CrossReferences
+from EmptyLineOptimizer import EmptyLineOptimizer
+from FileScanner import DEFAULT_IGNORE_PATTERNS, FileScanner
+from ImageLoader import ImageLoader
+from ListingReader import ListingReader
+from NestedText import parse_nested_text
+from Prefetcher import Prefetcher
 from TextCleaner import TextCleaner
 
 
 class ReportBuilder:
-    def __init__(self, filename, section_number=1):
+    def __init__(self, filename, section_number=1, streaming=False, report_class=None, image_cache=None,
+                 image_workers=4, source_list=None, fragment_cache=None, tracer=None, listing_reader=None,
+                 ignore_patterns=DEFAULT_IGNORE_PATTERNS, manifest=None, prefetch_window=16,
+                 prefetch_bytes=32 << 20):
+        """
+        In streaming mode actions are not accumulated until save(): each action is executed
+        as soon as the empty lines around it are decided, which only needs one neighbour.
+
+        report_class selects the backend that renders the actions, by default WordReportBuilder,
+        or for example OoxmlWordReportBuilder to write document.xml directly instead of through
+        python-docx. The backend, and with it python-docx, is loaded when it is first needed.
+        image_cache is an ImageCache that downscales images to the size they are shown at.
+        image_workers is the number of threads that load images for add_images_of_all_files().
+        source_list is the SourceList of this report, by default the current config.source_list.
+        fragment_cache is a FragmentCache that keeps every rendered section, so only the sections
+        that changed are rendered on the next build. It needs a report_class with fragments, such
+        as OoxmlWordReportBuilder, and does not work in streaming mode.
+        tracer is an ActionTracer that records the time and size of every rendered action.
+        listing_reader is a ListingReader with the size limits for listings.
+        ignore_patterns are the names of directories and files that the *_of_all_files() methods
+        skip, in addition to what .gitignore files exclude. The defaults cover version control,
+        IDE and cache directories; add FileScanner.BUILD_IGNORE_PATTERNS to skip dependencies and
+        build output too.
+        manifest is a FileManifest, so images and listings that did not change since the last run
+        are not probed again. It is given to the default ListingReader and saved with the report.
+        prefetch_window is how many actions ahead save() reads the files of images and listings
+        in the background while rendering, 0 turns this off. prefetch_bytes caps the file data
+        that has been read ahead and is waiting to be rendered.
+
+        Images, tables and listings can be given a label, and add_text() can refer to their
+        number with {ref:label}, also before they appear. The numbers are assigned when the
+        report is saved, so labels and references do not work in streaming mode.
+        """
+        if fragment_cache is not None and (streaming or not hasattr(report_class, 'start_fragment')):
+            raise ValueError("fragment_cache needs a report_class with fragments and no streaming")
+
         self.filename = filename
         self.section_number = section_number
+        self.streaming = streaming
+        self.source_list = source_list if source_list is not None else config.source_list
 
         self._actions = []
-        self._report = WordReportBuilder(filename)
+        self._optimized_actions = None
+        self._text_cleaner = TextCleaner()
+        self._has_actions = False
+        self._optimizer = EmptyLineOptimizer(self._EMPTY_LINE_RULES)
+        self._report_class = report_class
+        self._image_cache = image_cache
+        self._manifest = manifest
+        self._listing_reader = listing_reader
+        if listing_reader is None and manifest is not None:
+            self._listing_reader = ListingReader(manifest=manifest)
+        self._report = None
+        self._image_loader = ImageLoader(image_workers, image_cache, manifest)
+        self._fragment_cache = fragment_cache
+        self._tracer = tracer
+        self._prefetch_window = prefetch_window
+        self._prefetch_bytes = prefetch_bytes
+        self._prefetcher = None
+        self._image_scanner = FileScanner(self._IMAGE_EXTENSIONS, ignore_patterns)
+        self._listing_scanner = FileScanner(self._CODE_EXTENSIONS, ignore_patterns)
+
+    _IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff', '.svg'}
+
+    _CODE_EXTENSIONS = {
+        '.c', '.cpp', '.h', '.py', '.java', '.js', '.ts', '.rb', '.go', '.php',
+        '.html', '.css', '.sh', '.pl', '.swift', '.kt', '.scala', '.r', '.lua',
+        '.m', '.sql', '.bash', '.txt', '.md'
+    }
+
+    def _get_report_class(self):
+        if self._report_class is None:
+            from PracticeWordReportBuilder import WordReportBuilder
+            return WordReportBuilder
+
+        return self._report_class
+
+    def _get_report(self):
+        if self._report is None:
+            report_class = self._get_report_class()
+            self._report = report_class(self.filename, image_cache=self._image_cache, source_list=self.source_list,
+                                        listing_reader=self._listing_reader)
+
+        return self._report
 
     def _add_action(self, method_name, *args, **kwargs):
-        self._actions.append((method_name, args, kwargs))
+        action = (method_name, args, kwargs)
+        self._has_actions = True
+
+        if self.streaming:
+            for ready_action in self._optimizer.push(action):
+                self._execute_action(*ready_action)
+        else:
+            self._actions.append(action)
 
     def _add_empty_line_decorator(func):
         """
@@ -33,158 +130,205 @@ class ReportBuilder:
     def _add_empty_line(self):
         self._add_action("_add_empty_line")
 
-    def _remove_extra_empty_lines(self, actions):
+    # Pairs of neighbouring actions between which an empty line is not needed.
+    _EMPTY_LINE_RULES = {
+        ('add_text', 'add_text'),
+        ('add_text', 'add_image'),
+        ('add_image', 'add_text'),
+        ('add_text', 'add_listing'),
+        ('add_listing', 'add_text'),
+        ('add_text', 'add_list'),
+        ('add_text', 'add_numbered_list'),
+        ('add_list', 'add_text'),
+        ('add_numbered_list', 'add_text'),
+        ('add_list', 'add_list'),
+        ('add_list', 'add_numbered_list'),
+        ('add_numbered_list', 'add_list'),
+        ('add_numbered_list', 'add_numbered_list'),
+    }
+
+    def _optimize_empty_lines(self, actions):
+        """
+        Collapses repeated empty lines, removes them at the edges and between the pairs of
+        actions listed in _EMPTY_LINE_RULES. Makes a single pass looking one action ahead.
+        """
+        optimizer = EmptyLineOptimizer(self._EMPTY_LINE_RULES)
         optimized_actions = []
-        prev_action = None
 
         for action in actions:
-            method_name, args, kwargs = action
-            if method_name == '_add_empty_line' and prev_action == '_add_empty_line':
-                continue
-            optimized_actions.append(action)
-            prev_action = method_name
+            optimized_actions.extend(optimizer.push(action))
+
+        optimizer.flush()
 
         return optimized_actions
 
-    def _remove_empty_lines_between_text(self, actions):
-        optimized_actions = []
-        prev_action = None
+    def _execute_action(self, method_name, args, kwargs):
+        if self._tracer is None:
+            self._dispatch_action(method_name, args, kwargs)
+            return
 
-        for i, action in enumerate(actions):
-            method_name, args, kwargs = action
+        report = self._get_report()
 
-            if method_name == '_add_empty_line' and prev_action == 'add_text':
-                if i + 1 < len(actions) and actions[i + 1][0] == 'add_text':
-                    continue
+        if method_name in self._SECTION_STARTS:
+            self._tracer.start_section(self._get_section_name(method_name, args))
 
-            optimized_actions.append(action)
-            prev_action = method_name
+        self._tracer.start_action(report.get_written_size())
+        self._dispatch_action(method_name, args, kwargs)
+        self._tracer.end_action(method_name, report.get_written_size())
 
-        return optimized_actions
+    def _dispatch_action(self, method_name, args, kwargs):
+        report = self._get_report()
+        method = getattr(report, method_name)
 
-    def _remove_empty_lines_at_edges(self, actions):
-        if actions and actions[0][0] == '_add_empty_line':
-            actions.pop(0)
-        if actions and actions[-1][0] == '_add_empty_line':
-            actions.pop()
-        return actions
+        kwargs = {key: value.result() if isinstance(value, Future) else value for key, value in kwargs.items()}
+        kwargs.pop('label', None)
 
-    def _remove_empty_lines_between_text_and_list(self, actions):
-        optimized_actions = []
-        prev_action = None
+        if method.__name__ == "add_table":
+            # The first row is taken before the caption, so an empty iterable adds nothing.
+            rows = iter(args[1])
+            first_row = next(rows, None)
+            if first_row is None:
+                raise ValueError(f"Table {args[0]} has no rows")
 
-        for i, action in enumerate(actions):
-            method_name, args, kwargs = action
+            args = (args[0], itertools.chain([first_row], rows))
+            current_table_number = report.get_current_table_number()
+            report.add_text(f"TEXT зображено у таблиці {current_table_number}.")
+            report._add_empty_line()
+            kwargs["current_table_number"] = current_table_number
 
-            if method_name == '_add_empty_line' and prev_action == 'add_text':
-                if i + 1 < len(actions) and (
-                        actions[i + 1][0] == 'add_list' or actions[i + 1][0] == 'add_numbered_list'):
-                    continue
+        method(*args, **kwargs)
 
-            if method_name == '_add_empty_line' and (prev_action == 'add_list' or prev_action == 'add_numbered_list'):
-                if i + 1 < len(actions) and actions[i + 1][0] == 'add_text':
-                    continue
+    # Actions that start a new section of the report, which is cached and traced as a whole.
+    _SECTION_STARTS = {'add_introduction', 'add_section', 'add_source_list', 'add_table_of_contents'}
 
-            optimized_actions.append(action)
-            prev_action = method_name
+    def _check_streaming_reference(self):
+        if self.streaming:
+            raise ValueError("labels and references are resolved on save() and do not work in streaming mode")
 
-        return optimized_actions
+    def _resolve_references(self, actions):
+        """
+        Replaces the {ref:label} references with numbers before rendering. Reports without
+        references are returned as they are.
+        """
+        if not any(method_name == 'add_text' and REFERENCE_PATTERN.search(args[0])
+                   for method_name, args, kwargs in actions):
+            return actions
 
-    def _remove_empty_lines_between_lists(self, actions):
-        optimized_actions = []
-        prev_action = None
+        report = self._get_report()
+        references = CrossReferences(report.numbering.snapshot(), report.listing_reader)
+        references.assign(actions)
 
-        for i, action in enumerate(actions):
-            method_name, args, kwargs = action
+        return references.resolve(actions)
 
-            if method_name == '_add_empty_line' and (prev_action == 'add_list' or prev_action == 'add_numbered_list'):
-                if i + 1 < len(actions) and (
-                        actions[i + 1][0] == 'add_list' or actions[i + 1][0] == 'add_numbered_list'):
-                    continue
+    def _get_section_name(self, method_name, args):
+        return f"{method_name}: {" ".join(str(args[0]).split())[:60]}" if args else method_name
 
-            optimized_actions.append(action)
-            prev_action = method_name
+    def _trace(self, name):
+        return self._tracer.span(name) if self._tracer is not None else nullcontext()
 
-        return optimized_actions
+    def _prefetch(self, actions):
+        if not self._prefetch_window:
+            return actions
 
-    def _split_description_and_items(self, text):
-        text = text.strip()
-        lines = text.splitlines()
+        if self._prefetcher is None:
+            report = self._get_report()
+            self._prefetcher = Prefetcher(self._image_loader, report.listing_reader, report.IMAGE_WIDTH,
+                                          self._prefetch_window, self._prefetch_bytes)
 
-        lines = [line for line in lines if line.strip()]
+        return self._prefetcher.prefetch(actions)
 
-        description = lines[0] if lines else ""
+    def _split_sections(self, actions):
+        sections = [[]]
 
-        items = "\n".join(lines[1:]) if len(lines) > 1 else ""
-
-        return description.strip(), items
+        for action in actions:
+            if action[0] in self._SECTION_STARTS and sections[-1]:
+                sections.append([])
+            sections[-1].append(action)
 
-    def _remove_empty_lines_between_text_and_image(self, actions):
-        optimized_actions = []
-        prev_action = None
+        return sections
 
-        for i, action in enumerate(actions):
-            method_name, args, kwargs = action
+    def _execute_sections(self, actions):
+        """
+        Renders the actions section by section, taking the sections that did not change from
+        the fragment cache. The images loaded for a reused section are not needed any more.
+        The table of contents depends on all headings, so its section is always rendered, as
+        are sections that the cache cannot key, such as tables read from a generator.
+        """
+        report = self._get_report()
 
-            if method_name == '_add_empty_line' and prev_action == 'add_text':
-                if i + 1 < len(actions) and actions[i + 1][0] == 'add_image':
-                    continue
+        for section_actions in self._split_sections(actions):
+            key = None
+            if not any(action[0] == 'add_table_of_contents' for action in section_actions):
+                key = self._fragment_cache.get_key(section_actions, report.get_state(), self.source_list)
 
-            if method_name == '_add_empty_line' and prev_action == 'add_image':
-                if i + 1 < len(actions) and actions[i + 1][0] == 'add_text':
-                    continue
+            if key is None:
+                for action in self._prefetch(section_actions):
+                    self._execute_action(*action)
+                continue
 
-            optimized_actions.append(action)
-            prev_action = method_name
+            fragment = self._fragment_cache.load(key)
 
-        return optimized_actions
+            if fragment is None:
+                report.start_fragment()
+                for action in self._prefetch(section_actions):
+                    self._execute_action(*action)
+                self._fragment_cache.store(key, report.end_fragment())
+            else:
+                for method_name, args, kwargs in section_actions:
+                    for value in kwargs.values():
+                        if isinstance(value, Future):
+                            value.cancel()
 
-    def _remove_empty_lines_between_text_and_listing(self, actions):
-        optimized_actions = []
-        prev_action = None
+                with self._trace(f"reused {self._get_section_name(*section_actions[0][:2])}"):
+                    report.add_fragment(fragment)
 
-        for i, action in enumerate(actions):
-            method_name, args, kwargs = action
+    def _split_description_and_items(self, text):
+        text = text.strip()
+        lines = text.splitlines()
 
-            if method_name == '_add_empty_line' and prev_action == 'add_text':
-                if i + 1 < len(actions) and actions[i + 1][0] == 'add_listing':
-                    continue
+        lines = [line for line in lines if line.strip()]
 
-            if method_name == '_add_empty_line' and prev_action == 'add_listing':
-                if i + 1 < len(actions) and actions[i + 1][0] == 'add_text':
-                    continue
+        description = lines[0] if lines else ""
 
-            optimized_actions.append(action)
-            prev_action = method_name
+        items = "\n".join(lines[1:]) if len(lines) > 1 else ""
 
-        return optimized_actions
+        return description.strip(), items
 
     def add_introduction(self, text):
-        cleaned_text_text = TextCleaner.clean_text(text)
+        cleaned_text_text = self._text_cleaner.clean_text(text)
 
         self._add_action("add_introduction", cleaned_text_text)
 
+    def add_table_of_contents(self):
+        """
+        Adds the contents page here. The entries are filled in on save() from all headings.
+        """
+        self._add_action("add_table_of_contents")
+
     @_add_empty_line_decorator
     def add_section(self, text):
-        cleaned_text_text = TextCleaner.clean_text(text)
+        cleaned_text_text = self._text_cleaner.clean_text(text)
 
         self._add_action("add_section", cleaned_text_text)
 
     @_add_empty_line_decorator
     def add_sub_section(self, text):
-        cleaned_text_text = TextCleaner.clean_text(text)
+        cleaned_text_text = self._text_cleaner.clean_text(text)
 
         self._add_action("add_sub_section", cleaned_text_text)
 
     @_add_empty_line_decorator
     def add_sub_sub_section(self, text):
-        cleaned_text_text = TextCleaner.clean_text(text)
+        cleaned_text_text = self._text_cleaner.clean_text(text)
 
         self._add_action("add_sub_sub_section", cleaned_text_text)
 
     @_add_empty_line_decorator
     def add_text(self, text):
-        cleaned_text = TextCleaner.clean_text(text)
+        cleaned_text = self._text_cleaner.clean_text(text)
+
+        if REFERENCE_PATTERN.search(cleaned_text):
+            self._check_streaming_reference()
 
         self._add_action("add_text", cleaned_text)
 
@@ -198,8 +342,12 @@ class ReportBuilder:
         else:
             raise TypeError("add_list() принимает 1 или 2 аргумента")
 
-        cleaned_description = TextCleaner.clean_text(description)
-        cleaned_items = TextCleaner.clean_items(items)
+        cleaned_description = self._text_cleaner.clean_text(description)
+        cleaned_items = self._text_cleaner.clean_items(items)
+
+        if isinstance(cleaned_items, str):
+            cleaned_items = parse_nested_text(cleaned_items)
+
         self._add_action("add_list", cleaned_description, cleaned_items)
 
     @_add_empty_line_decorator
@@ -212,88 +360,199 @@ class ReportBuilder:
         else:
             raise TypeError("add_numbered_list() принимает 1 или 2 аргумента")
 
-        cleaned_description = TextCleaner.clean_text(description)
+        cleaned_description = self._text_cleaner.clean_text(description)
         self._add_action("add_numbered_list", cleaned_description, items)
 
     @_add_empty_line_decorator
-    def add_image(self, image_path, description):
-        cleaned_description = TextCleaner.clean_text(description)
+    def add_image(self, image_path, description, loaded_image=None, label=None):
+        cleaned_description = self._text_cleaner.clean_text(description)
 
-        self._add_action("add_image", image_path, cleaned_description)
+        kwargs = {}
+        if loaded_image is not None:
+            kwargs['loaded_image'] = loaded_image
+        if label is not None:
+            self._check_streaming_reference()
+            kwargs['label'] = label
+
+        self._add_action("add_image", image_path, cleaned_description, **kwargs)
 
     @_add_empty_line_decorator
     def add_images_of_all_files(self, directory):
         if not os.path.isdir(directory):
             raise ValueError(f"{directory} is not a directory")
 
-        image_extensions = {'.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff', '.svg'}
+        image_paths = self._image_scanner.scan(directory)
+
+        # Otherwise save() reads the images ahead while rendering, a bounded number at a time.
+        if not self.streaming:
+            for file_path in image_paths:
+                self.add_image(file_path, "TEXT")
+            return
 
-        for root, dirs, files in os.walk(directory):
-            for file_name in files:
-                file_path = os.path.join(root, file_name)
+        for file_path, loaded_image in self._load_images_ahead(image_paths):
+            self.add_image(file_path, "TEXT", loaded_image=loaded_image)
 
-                if os.path.isfile(file_path) and any(file_name.lower().endswith(ext) for ext in image_extensions):
-                    description = f"TEXT"
-                    self.add_image(file_path, description)
+    def _load_images_ahead(self, image_paths):
+        """
+        Yields the paths with the futures of their images, keeping only as many images loading
+        ahead as the loader has workers. In streaming mode an image is rendered as soon as the
+        next one is added, so the loaded images do not pile up.
+        """
+        image_width = self._get_report_class().IMAGE_WIDTH
+        loading = deque()
+
+        for file_path in image_paths:
+            loading.append((file_path, self._image_loader.submit(file_path, image_width)))
+
+            if len(loading) > self._image_loader.workers:
+                yield loading.popleft()
+
+        yield from loading
 
     @_add_empty_line_decorator
-    def add_listing(self, file_path):
-        self._add_action("add_listing", file_path)
+    def add_listing(self, file_path, label=None):
+        if label is None:
+            self._add_action("add_listing", file_path)
+        else:
+            self._check_streaming_reference()
+            self._add_action("add_listing", file_path, label=label)
 
     @_add_empty_line_decorator
     def add_listings_of_all_files(self, directory):
         if not os.path.isdir(directory):
             raise ValueError(f"{directory} is not a directory")
 
-        code_extensions = {
-            '.c', '.cpp', '.h', '.py', '.java', '.js', '.ts', '.rb', '.go', '.php',
-            '.html', '.css', '.sh', '.pl', '.swift', '.kt', '.scala', '.r', '.lua',
-            '.m', '.sql', '.bash', '.txt', '.md'
-        }
+        for file_path in self._listing_scanner.scan(directory):
+            self.add_listing(file_path)
 
-        for root, dirs, files in os.walk(directory):
-            for file_name in files:
-                file_path = os.path.join(root, file_name)
+    @_add_empty_line_decorator
+    def add_table(self, description, items, label=None, header_rows=0):
+        """
+        items can be any iterable of rows, for example a generator that reads a large log: the
+        rows are consumed one by one when the table is rendered. The first header_rows rows are
+        repeated at the top of every page. A table without rows is an error, raised here for a
+        list and when the table is rendered for other iterables.
+        """
+        if isinstance(items, (list, tuple)) and not items:
+            raise ValueError(f"Table {description} has no rows")
 
-                if os.path.isfile(file_path) and any(file_name.lower().endswith(ext) for ext in code_extensions):
-                    self.add_listing(file_path)
+        cleaned_description = self._text_cleaner.clean_text(description)
 
-    @_add_empty_line_decorator
-    def add_table(self, description, items):
-        cleaned_description = TextCleaner.clean_text(description)
+        kwargs = {}
+        if header_rows != 0:
+            kwargs['header_rows'] = header_rows
+        if label is not None:
+            self._check_streaming_reference()
+            kwargs['label'] = label
 
-        self._add_action("add_table", cleaned_description, items)
+        self._add_action("add_table", cleaned_description, items, **kwargs)
+
+    def add_table_from_csv(self, path, description, columns=None, delimiter=None, encoding=None, label=None,
+                           header_rows=1):
+        """
+        Adds a table from a CSV or TSV file, which is read row by row when the table is rendered.
+        The encoding (UTF-8, UTF-16 or cp1251) and the delimiter are recognised unless given.
+        columns is a list of header names or indexes that selects and orders the columns. The
+        first line of a CSV file is its header, so it is repeated on every page by default.
+        """
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"CSV file not found: {path}")
+
+        self.add_table(description, CsvTable(path, columns, delimiter, encoding), label=label,
+                       header_rows=header_rows)
 
     def add_source_list(self):
         self._add_action("add_source_list")
 
+    def get_plan(self):
+        """
+        Returns the recorded actions with the empty lines already optimised, together with the
+        sources of the report. The plan can be stored and given to load_plan() later to render
+        the same report without recording it again.
+        """
+        actions = []
+
+        for method_name, args, kwargs in self._optimize_empty_lines(self._actions):
+            kwargs = {key: value for key, value in kwargs.items() if not isinstance(value, Future)}
+            actions.append((method_name, args, kwargs))
+
+        return {'actions': actions, 'sources': list(self.source_list.get_sources().values())}
+
+    def load_plan(self, plan):
+        """
+        Takes the actions and sources from a plan returned by get_plan(). The actions are
+        executed by save() as they are, which reads the images ahead while rendering.
+        """
+        self.source_list.add_sources(plan['sources'])
+
+        self._optimized_actions = list(plan['actions'])
+
+        self._has_actions = bool(self._optimized_actions)
+
     def save(self):
         """
-        Executes all accumulated actions and saves the document.
+        Executes all accumulated actions and saves the document. In streaming mode the actions
+        have already been executed and only the document is saved. If the build fails, the
+        partially written document is removed.
         """
-        if not self._actions:
+        if not self._has_actions:
             return
 
-        actions = self._remove_extra_empty_lines(self._actions)
-        actions = self._remove_empty_lines_between_text(actions)
-        actions = self._remove_empty_lines_at_edges(actions)
-        actions = self._remove_empty_lines_between_text_and_image(actions)
-        actions = self._remove_empty_lines_between_text_and_listing(actions)
-        actions = self._remove_empty_lines_between_text_and_list(actions)
-        actions = self._remove_empty_lines_between_lists(actions)
+        try:
+            self._save()
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        """
+        Abandons the report: stops loading files and lets the backend remove what it has
+        written so far. save() does this itself when it fails; a streaming build that is given
+        up before save() should call it.
+        """
+        self._image_loader.shutdown()
+        if self._prefetcher is not None:
+            self._prefetcher.shutdown()
+
+        if self._report is not None:
+            self._report.close()
+
+    def _save(self):
+        if self._optimized_actions is not None:
+            actions = self._optimized_actions
+        elif self.streaming:
+            self._optimizer.flush()
+            actions = []
+        else:
+            with self._trace("optimize empty lines"):
+                actions = self._optimize_empty_lines(self._actions)
+
+        with self._trace("resolve references"):
+            actions = self._resolve_references(actions)
+
+        if self._fragment_cache is not None:
+            self._execute_sections(actions)
+        else:
+            for action in self._prefetch(actions):
+                self._execute_action(*action)
+
+        self._image_loader.shutdown()
+        if self._prefetcher is not None:
+            self._prefetcher.shutdown()
 
-        for method_name, args, kwargs in actions:
-            method = getattr(self._report, method_name)
+        if self._manifest is not None:
+            self._manifest.save()
 
-            if method.__name__ == "add_table":
-                current_table_number = self._report.get_current_table_number()
-                self._report.add_text(f"TEXT зображено у таблиці {current_table_number}.")
-                self._report._add_empty_line()
-                kwargs["current_table_number"] = current_table_number
+        with self._trace("save document"):
+            self._get_report().save()
 
-            method(*args, **kwargs)
+        if self._tracer is not None:
+            self._tracer.finish()
 
-        self._report.save()
+        if self._fragment_cache is not None:
+            self._fragment_cache.prune()
+            print(f"Sections reused: {self._fragment_cache.reused} of "
+                  f"{self._fragment_cache.reused + self._fragment_cache.rendered}")
 
     def _remove_section_number(self):
         self._add_action("_remove_section_number")
@@ -0,0 +1,178 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+import tomllib
+
+from FileScanner import DEFAULT_IGNORE_PATTERNS, FileScanner
+from ReportBuilder import ReportBuilder
+from SourceList import SourceList
+
+# Increase when the recorded actions change, so plans compiled by older code are not reused.
+PLAN_VERSION = 4
+
+SPEC_EXTENSIONS = ('.json', '.toml')
+
+_SPEC_METHODS = {
+    'table_of_contents': 'add_table_of_contents',
+    'introduction': 'add_introduction',
+    'section': 'add_section',
+    'sub_section': 'add_sub_section',
+    'sub_sub_section': 'add_sub_sub_section',
+    'text': 'add_text',
+    'list': 'add_list',
+    'numbered_list': 'add_numbered_list',
+    'table': 'add_table',
+    'table_from_csv': 'add_table_from_csv',
+    'image': 'add_image',
+    'images_of_all_files': 'add_images_of_all_files',
+    'listing': 'add_listing',
+    'listings_of_all_files': 'add_listings_of_all_files',
+    'source_list': 'add_source_list',
+}
+
+_SOURCE_PATTERN = re.compile(r'\{source:([^{}]+)\}')
+
+
+def load_spec(spec_path):
+    """
+    Reads a JSON or TOML report spec. Returns the parsed spec and its raw bytes.
+    """
+    with open(spec_path, 'rb') as f:
+        spec_bytes = f.read()
+
+    if spec_path.lower().endswith('.toml'):
+        spec = tomllib.loads(spec_bytes.decode('utf-8'))
+    else:
+        spec = json.loads(spec_bytes)
+
+    return spec, spec_bytes
+
+
+def _get_directory(value):
+    """
+    Returns the directory of an *_of_all_files element given in any of the forms _record()
+    accepts, or None when it names none.
+    """
+    if isinstance(value, dict):
+        value = value.get('directory')
+    elif isinstance(value, list):
+        value = value[0] if value else None
+
+    return value if isinstance(value, str) else None
+
+
+def _get_plan_key(spec, spec_bytes, ignore_patterns):
+    """
+    The plan depends on the spec and on which files the *_of_all_files elements find, so the
+    key covers both. File contents are read only when rendering and are not part of the key.
+    """
+    key = hashlib.sha256(f"{PLAN_VERSION}\n".encode('utf-8'))
+    key.update(spec_bytes)
+
+    scanner = FileScanner(ignore_patterns=ignore_patterns)
+
+    for entry in spec.get('content', []):
+        for kind, value in entry.items():
+            if kind not in ('images_of_all_files', 'listings_of_all_files'):
+                continue
+
+            directory = _get_directory(value)
+            if directory is not None and os.path.isdir(directory):
+                for file_path in scanner.scan(directory):
+                    key.update(file_path.encode('utf-8', 'surrogateescape'))
+
+    return key.hexdigest()
+
+
+def _substitute_sources(value, sources, source_list):
+    """
+    Replaces {source:key} with the number of sources[key], in the order the references appear.
+    """
+    if isinstance(value, str):
+        return _SOURCE_PATTERN.sub(lambda match: str(source_list.add_source(sources[match.group(1)])), value)
+    if isinstance(value, list):
+        return [_substitute_sources(item, sources, source_list) for item in value]
+    if isinstance(value, dict):
+        return {key: _substitute_sources(item, sources, source_list) for key, item in value.items()}
+    return value
+
+
+def _record(report, spec):
+    sources = spec.get('sources', {})
+
+    for entry in spec['content']:
+        for kind, value in entry.items():
+            if kind not in _SPEC_METHODS:
+                raise ValueError(f"Unknown report element: {kind}")
+
+            method = getattr(report, _SPEC_METHODS[kind])
+            value = _substitute_sources(value, sources, report.source_list)
+
+            if value is None or value is True:
+                method()
+            elif isinstance(value, dict):
+                method(**value)
+            elif isinstance(value, list):
+                method(*value)
+            else:
+                method(value)
+
+
+def _load_plan(plan_path):
+    try:
+        with open(plan_path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def _store_plan(plan_path, plan):
+    os.makedirs(os.path.dirname(plan_path), exist_ok=True)
+
+    temp_path = f"{plan_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        pickle.dump(plan, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, plan_path)
+
+
+def build_report(spec_path, cache_directory='.plan_cache', **report_options):
+    """
+    Builds the report described by a spec. The recorded and optimised actions are cached by the
+    hash of the spec, so an unchanged spec is rendered without cleaning the texts, parsing the
+    lists or optimising the empty lines again. Paths in the spec are relative to the working
+    directory, as in practice.py.
+    """
+    spec, spec_bytes = load_spec(spec_path)
+
+    report = ReportBuilder(spec['filename'], spec.get('section_number', 1), source_list=SourceList(),
+                           **report_options)
+
+    plan = None
+
+    if cache_directory:
+        ignore_patterns = report_options.get('ignore_patterns', DEFAULT_IGNORE_PATTERNS)
+        plan_key = _get_plan_key(spec, spec_bytes, ignore_patterns)
+        plan_path = os.path.join(cache_directory, f"{plan_key}.pickle")
+        plan = _load_plan(plan_path)
+
+    if plan is None:
+        _record(report, spec)
+
+        if cache_directory:
+            _store_plan(plan_path, report.get_plan())
+    else:
+        report.load_plan(plan)
+
+    report.save()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Builds a report from a JSON or TOML spec.")
+    parser.add_argument("spec", help="path to the report spec")
+    parser.add_argument("--no-cache", action="store_true", help="record the report again instead of using the cache")
+    args = parser.parse_args()
+
+    build_report(args.spec, cache_directory=None if args.no_cache else '.plan_cache')
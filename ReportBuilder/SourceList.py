@@ -1,7 +1,17 @@
+import re
+
+
 class SourceList:
-    def __init__(self):
+    def __init__(self, normalize=False):
+        """
+        With normalize=True sources that differ only in case, whitespace or punctuation
+        share one number.
+        """
         self.sources = {}
         self.counter = 0
+        self.normalize = normalize
+
+        self._numbers = {}
 
     def get_sources(self):
         return self.sources
@@ -9,12 +19,25 @@ class SourceList:
     def _get_next_counter(self):
         self.counter += 1
         return self.counter
-        
+
+    def _get_key(self, text):
+        if not self.normalize:
+            return text
+
+        text = re.sub(r'[^\w\s]', '', text)
+        return " ".join(text.split()).casefold()
+
     def add_source(self, text):
-        for number, value in self.sources.items():
-            if value == text:
-                return number
+        key = self._get_key(text)
+
+        number = self._numbers.get(key)
+        if number is not None:
+            return number
 
         self.counter = self._get_next_counter()
         self.sources[self.counter] = text
+        self._numbers[key] = self.counter
         return self.counter
+
+    def add_sources(self, texts):
+        return [self.add_source(text) for text in texts]
@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+_FIRST_REPORT_SCRIPT = """
+import os, sys, tempfile, time
+start = time.perf_counter()
+from ReportBuilder import ReportBuilder
+from SourceList import SourceList
+imported = time.perf_counter()
+with tempfile.TemporaryDirectory() as directory:
+    report = ReportBuilder(os.path.join(directory, "startup.docx"), source_list=SourceList())
+    report.add_text("Text")
+    sys.stdout = open(os.devnull, "w")
+    report.save()
+saved = time.perf_counter()
+sys.stderr.write(f"{imported - start} {saved - start}\\n")
+"""
+
+
+def _run(arguments):
+    """
+    Runs Python in a fresh process next to the modules, so nothing is imported in advance.
+    """
+    result = subprocess.run([sys.executable, *arguments], cwd=_DIRECTORY, capture_output=True, text=True)
+
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+
+    return result.stderr
+
+
+def measure_imports(module="ReportBuilder"):
+    """
+    Imports the module with -X importtime and returns the imported modules as
+    (name, self microseconds, cumulative microseconds), most expensive first.
+    """
+    imports = []
+
+    for line in _run(["-X", "importtime", "-c", f"import {module}"]).splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_time, cumulative_time, name = line[len("import time:"):].split("|")
+        imports.append((name.strip(), int(self_time), int(cumulative_time)))
+
+    return sorted(imports, key=lambda item: item[2], reverse=True)
+
+
+def measure_first_report():
+    """
+    Returns the seconds a fresh process needs to import ReportBuilder and to save a report with
+    one paragraph, counted from the start of the import.
+    """
+    import_time, report_time = _run(["-c", _FIRST_REPORT_SCRIPT]).split()
+    return float(import_time), float(report_time)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reports how long a cold start of ReportBuilder takes.")
+    parser.add_argument("--module", default="ReportBuilder", help="module whose import is measured")
+    parser.add_argument("--top", type=int, default=15, help="number of most expensive imports to show")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON to keep track of them")
+    args = parser.parse_args()
+
+    imports = measure_imports(args.module)
+    import_time, report_time = measure_first_report()
+
+    if args.json:
+        print(json.dumps({
+            "python": sys.version.split()[0],
+            "module": args.module,
+            "import_us": imports[0][2] if imports else 0,
+            "imports": [{"module": name, "self_us": self_time, "cumulative_us": cumulative_time}
+                        for name, self_time, cumulative_time in imports[:args.top]],
+            "first_report_import_s": import_time,
+            "first_report_s": report_time,
+        }, indent=2))
+    else:
+        print(f"{'cumulative, ms':>14}  {'self, ms':>8}  module")
+
+        for name, self_time, cumulative_time in imports[:args.top]:
+            print(f"{cumulative_time / 1000:>14.1f}  {self_time / 1000:>8.1f}  {name}")
+
+        print()
+        print(f"Import of ReportBuilder in a new process: {import_time * 1000:.1f} ms")
+        print(f"Import and the first saved report: {report_time * 1000:.1f} ms")
@@ -1,40 +1,44 @@
 class TextCleaner:
-    prev_and = "та"
+    """
+    Cleans the texts of one document. Every "і" and "та" is replaced so that the two
+    conjunctions alternate through the document, starting with "і". The alternation state
+    belongs to the instance, so separate documents can be cleaned in parallel threads or
+    processes without affecting each other.
+    """
 
-    @staticmethod
-    def clean_text(text):
+    _ALTERNATE_AND = {"і": "та", "та": "і"}
+
+    def __init__(self):
+        self.prev_and = "та"
+
+    def clean_text(self, text):
         try:
             lines = text.split('\n')
 
-            cleaned_lines = [TextCleaner.alternate_and(line) for line in lines]
+            cleaned_lines = [self.alternate_and(line) for line in lines]
 
             text = '\n'.join(cleaned_lines)
         except Exception:
             text = text
         return text.strip().strip(" -–.")
 
+    def clean_many(self, texts):
+        """
+        Cleans the texts in order as one continuous document, so "і" and "та" keep alternating
+        from one text to the next.
+        """
+        return [self.clean_text(text) for text in texts]
+
     @staticmethod
     def clean_items(items):
         return items
 
-    @staticmethod
-    def alternate_and(text):
-        result = []
+    def alternate_and(self, text):
         words = text.split()
 
-        for word in words:
-            if word == "і" and TextCleaner.prev_and == "і":
-                result.append("та")
-                TextCleaner.prev_and = "та"
-            elif word == "та" and TextCleaner.prev_and == "та":
-                result.append("і")
-                TextCleaner.prev_and = "і"
-            else:
-                result.append(word)
-
-                if word == "і":
-                    TextCleaner.prev_and = "і"
-                elif word == "та":
-                    TextCleaner.prev_and = "та"
-
-        return " ".join(result)
+        for i, word in enumerate(words):
+            if word in self._ALTERNATE_AND:
+                self.prev_and = self._ALTERNATE_AND[self.prev_and]
+                words[i] = self.prev_and
+
+        return " ".join(words)
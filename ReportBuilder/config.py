@@ -7,4 +7,13 @@ def add_source(text):
     return source_list.add_source(text)
 
 
+def new_source_list():
+    """
+    Starts a fresh source list for the next report built in this process.
+    """
+    global source_list
+    source_list = SourceList()
+    return source_list
+
+
 start_section_number = 1
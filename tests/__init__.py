@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules of ReportBuilder import each other by name, as practice.py does from its directory.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ReportBuilder'))
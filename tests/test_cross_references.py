@@ -0,0 +1,61 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from CrossReferences import CrossReferences
+from ListingReader import ListingReader
+from Numbering import Numbering
+from OoxmlWordReportBuilder import OoxmlWordReportBuilder
+from ReportBuilder import ReportBuilder
+from SourceList import SourceList
+
+
+class CrossReferencesTest(unittest.TestCase):
+    def _resolve(self, actions):
+        references = CrossReferences(Numbering(1).snapshot(), ListingReader())
+        references.assign(actions)
+        return references.resolve(actions)
+
+    def test_references_are_resolved_before_the_element(self):
+        actions = [
+            ('add_section', ("Розділ",), {}),
+            ('add_text', ("Дані у таблиці {ref:data}, схема на рисунку {ref:scheme}.",), {}),
+            ('add_image', ("first.png", "Перший"), {}),
+            ('add_table', ("Дані", [["a"]]), {'label': 'data'}),
+            ('add_image', ("scheme.png", "Схема"), {'label': 'scheme'}),
+        ]
+
+        self.assertEqual(self._resolve(actions)[1][1][0], "Дані у таблиці 2.1, схема на рисунку 2.2.")
+
+    def test_unknown_label_is_an_error(self):
+        actions = [
+            ('add_section', ("Розділ",), {}),
+            ('add_text', ("Див. рисунок {ref:missing}.",), {}),
+            ('add_image', ("scheme.png", "Схема"), {'label': 'scheme'}),
+        ]
+
+        with self.assertRaisesRegex(ValueError, "Unknown label: missing"):
+            self._resolve(actions)
+
+    def test_repeated_label_is_an_error(self):
+        actions = [('add_image', ("a.png", "A"), {'label': 'same'}), ('add_table', ("B", [["b"]]), {'label': 'same'})]
+
+        with self.assertRaisesRegex(ValueError, "used more than once"):
+            self._resolve(actions)
+
+    def test_save_fails_on_an_unknown_label(self):
+        with tempfile.TemporaryDirectory() as directory:
+            report = ReportBuilder(os.path.join(directory, 'report.docx'), report_class=OoxmlWordReportBuilder,
+                                   source_list=SourceList())
+            report.add_section("Розділ")
+            report.add_text("Див. таблицю {ref:results}.")
+            report.add_table("Результати", [["a", "b"]], label='result')
+
+            with contextlib.redirect_stdout(io.StringIO()), self.assertRaisesRegex(ValueError, "results"):
+                report.save()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import codecs
+import os
+import tempfile
+import unittest
+
+from CsvTable import CsvTable
+
+
+class CsvTableTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def _write(self, name, content):
+        path = os.path.join(self.directory, name)
+
+        with open(path, 'wb') as f:
+            f.write(content)
+
+        return path
+
+    def test_utf8_with_bom_and_semicolons(self):
+        path = self._write('data.csv', codecs.BOM_UTF8 + "Назва;Ціна\nХліб;25,50\n".encode('utf-8'))
+
+        self.assertEqual(list(CsvTable(path)), [["Назва", "Ціна"], ["Хліб", "25,50"]])
+
+    def test_cp1251_from_excel(self):
+        path = self._write('data.csv', "Назва;Кількість\r\nМолоко;2\r\n".encode('cp1251'))
+
+        self.assertEqual(list(CsvTable(path)), [["Назва", "Кількість"], ["Молоко", "2"]])
+
+    def test_utf16_with_tabs(self):
+        path = self._write('data.txt', "Назва\tЦіна\nСир\t90\n".encode('utf-16'))
+
+        self.assertEqual(list(CsvTable(path)), [["Назва", "Ціна"], ["Сир", "90"]])
+
+    def test_utf8_character_cut_by_the_sample_stays_utf8(self):
+        header = "a" * (CsvTable.SAMPLE_SIZE - 1) + "ї,b\n"
+        path = self._write('data.csv', (header + "1,2\n").encode('utf-8'))
+
+        self.assertEqual(list(CsvTable(path))[1], ["1", "2"])
+
+    def test_delimiter_is_taken_from_the_header_row(self):
+        path = self._write('data.csv', "a|b|c\n\"x,y\"|2|3\n".encode('utf-8'))
+
+        self.assertEqual(list(CsvTable(path)), [["a", "b", "c"], ["x,y", "2", "3"]])
+
+    def test_single_column_falls_back_by_extension(self):
+        self.assertEqual(CsvTable('data.tsv')._detect_delimiter("name\nvalue\n"), '\t')
+        self.assertEqual(CsvTable('data.csv')._detect_delimiter("name\nvalue\n"), ',')
+
+    def test_given_delimiter_and_encoding_win(self):
+        path = self._write('data.csv', "a;b,c\n1;2,3\n".encode('cp1251'))
+
+        self.assertEqual(list(CsvTable(path, delimiter=',', encoding='cp1251')), [["a;b", "c"], ["1;2", "3"]])
+
+    def test_columns_by_name_and_index(self):
+        path = self._write('data.csv', "id, name ,price\n1,Хліб,25\n2,Сир\n".encode('utf-8'))
+
+        self.assertEqual(list(CsvTable(path, columns=['price', 1])), [["price", " name "], ["25", "Хліб"], ["", "Сир"]])
+
+        with self.assertRaisesRegex(ValueError, "Column weight not found"):
+            list(CsvTable(path, columns=['weight']))
+
+
+if __name__ == '__main__':
+    unittest.main()
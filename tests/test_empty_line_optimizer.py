@@ -0,0 +1,102 @@
+import random
+import unittest
+
+from EmptyLineOptimizer import EmptyLineOptimizer
+from ReportBuilder import ReportBuilder
+from SourceList import SourceList
+
+_LISTS = ('add_list', 'add_numbered_list')
+
+
+def _remove_pairs(actions, pairs):
+    """
+    One of the passes ReportBuilder.save() used to make: drops an empty line between two
+    actions that form one of the pairs.
+    """
+    optimized_actions = []
+    prev_action = None
+
+    for i, action in enumerate(actions):
+        method_name = action[0]
+
+        if method_name == '_add_empty_line' and i + 1 < len(actions) and (prev_action, actions[i + 1][0]) in pairs:
+            continue
+
+        optimized_actions.append(action)
+        prev_action = method_name
+
+    return optimized_actions
+
+
+def _optimize_as_before(actions):
+    """
+    The empty-line passes of ReportBuilder.save() before EmptyLineOptimizer, in their order.
+    """
+    optimized_actions = []
+    prev_action = None
+    for action in actions:
+        if action[0] == '_add_empty_line' and prev_action == '_add_empty_line':
+            continue
+        optimized_actions.append(action)
+        prev_action = action[0]
+
+    actions = _remove_pairs(optimized_actions, {('add_text', 'add_text')})
+
+    if actions and actions[0][0] == '_add_empty_line':
+        actions.pop(0)
+    if actions and actions[-1][0] == '_add_empty_line':
+        actions.pop()
+
+    actions = _remove_pairs(actions, {('add_text', 'add_image'), ('add_image', 'add_text')})
+    actions = _remove_pairs(actions, {('add_text', 'add_listing'), ('add_listing', 'add_text')})
+    actions = _remove_pairs(actions, {('add_text', name) for name in _LISTS} | {(name, 'add_text') for name in _LISTS})
+    actions = _remove_pairs(actions, {(first, second) for first in _LISTS for second in _LISTS})
+
+    return actions
+
+
+class EmptyLineOptimizerTest(unittest.TestCase):
+    METHOD_NAMES = ('_add_empty_line', '_add_empty_line', 'add_text', 'add_image', 'add_listing', 'add_list',
+                    'add_numbered_list', 'add_table', 'add_section')
+
+    def _random_actions(self, rnd):
+        return [(rnd.choice(self.METHOD_NAMES), (index,), {}) for index in range(rnd.randint(0, 30))]
+
+    def test_same_result_as_the_previous_passes(self):
+        report = ReportBuilder("unused.docx", source_list=SourceList())
+        rnd = random.Random(1)
+
+        for _ in range(5000):
+            actions = self._random_actions(rnd)
+            self.assertEqual(report._optimize_empty_lines(actions), _optimize_as_before(actions), actions)
+
+    def test_streaming_releases_the_same_actions(self):
+        rnd = random.Random(2)
+
+        for _ in range(1000):
+            actions = self._random_actions(rnd)
+            optimizer = EmptyLineOptimizer(ReportBuilder._EMPTY_LINE_RULES)
+
+            released = []
+            for action in actions:
+                ready_actions = optimizer.push(action)
+                released.extend(ready_actions)
+
+                # Only an empty line is held back, any other action is released at once.
+                if action[0] != '_add_empty_line':
+                    self.assertEqual(ready_actions[-1], action)
+            optimizer.flush()
+
+            self.assertEqual(released, _optimize_as_before(actions))
+
+    def test_empty_line_kept_between_unrelated_actions(self):
+        optimizer = EmptyLineOptimizer(ReportBuilder._EMPTY_LINE_RULES)
+        actions = [('add_text', (), {}), ('_add_empty_line', (), {}), ('add_table', (), {})]
+
+        released = [ready for action in actions for ready in optimizer.push(action)]
+
+        self.assertEqual(released, actions)
+
+
+if __name__ == '__main__':
+    unittest.main()
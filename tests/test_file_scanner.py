@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+from FileScanner import BUILD_IGNORE_PATTERNS, DEFAULT_IGNORE_PATTERNS, FileScanner, natural_sort_key
+
+
+class FileScannerTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def _write(self, relative_path, text=""):
+        path = os.path.join(self.directory, *relative_path.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def _scan(self, scanner=None):
+        scanner = scanner or FileScanner(['.py'])
+        return [os.path.relpath(path, self.directory).replace(os.sep, '/') for path in scanner.scan(self.directory)]
+
+    def test_natural_sort_key(self):
+        names = ["10.png", " 5.1.png", "Figure 2.png", "figure 10.png", "5.png"]
+
+        self.assertEqual(sorted(names, key=natural_sort_key),
+                         [" 5.1.png", "5.png", "10.png", "Figure 2.png", "figure 10.png"])
+
+    def test_files_come_in_natural_order_before_subdirectories(self):
+        for relative_path in ('lab10.py', 'lab2.py', 'a/lab1.py', 'notes.txt'):
+            self._write(relative_path)
+
+        self.assertEqual(self._scan(), ['lab2.py', 'lab10.py', 'a/lab1.py'])
+
+    def test_gitignore_negation(self):
+        self._write('.gitignore', "*.py\n!keep.py\n")
+        self._write('drop.py')
+        self._write('keep.py')
+        self._write('sub/keep.py')
+
+        self.assertEqual(self._scan(), ['keep.py', 'sub/keep.py'])
+
+    def test_gitignore_anchoring(self):
+        self._write('.gitignore', "/top.py\ngen/\ndocs/*.py\n")
+        for relative_path in ('top.py', 'sub/top.py', 'gen/a.py', 'sub/gen/b.py', 'docs/c.py', 'sub/docs/d.py'):
+            self._write(relative_path)
+
+        self.assertEqual(self._scan(), ['sub/top.py', 'sub/docs/d.py'])
+
+    def test_nested_gitignore_applies_to_its_directory(self):
+        self._write('sub/.gitignore', "/a.py\n")
+        self._write('a.py')
+        self._write('sub/a.py')
+        self._write('sub/b.py')
+
+        self.assertEqual(self._scan(), ['a.py', 'sub/b.py'])
+
+    def test_build_directories_are_skipped_only_when_asked(self):
+        self._write('build/main.py')
+        self._write('.git/hook.py')
+
+        self.assertEqual(self._scan(), ['build/main.py'])
+        self.assertEqual(self._scan(FileScanner(['.py'], DEFAULT_IGNORE_PATTERNS + BUILD_IGNORE_PATTERNS)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+
+from PIL import Image
+
+from FragmentCache import FragmentCache
+from ListingReader import ListingReader
+from OoxmlWordReportBuilder import OoxmlWordReportBuilder
+from ReportBuilder import ReportBuilder
+from SourceList import SourceList
+
+
+def _write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+class FragmentCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+        # Images that are not found are looked up in the Images directory of the working directory.
+        chdir = contextlib.chdir(self.directory)
+        chdir.__enter__()
+        self.addCleanup(chdir.__exit__, None, None, None)
+
+    def _path(self, *names):
+        return os.path.join(self.directory, *names)
+
+    def _get_key(self, actions, state=None):
+        return FragmentCache(self._path('.fragment_cache')).get_key(actions, state, SourceList())
+
+    def _build(self, listing_reader=None):
+        fragment_cache = FragmentCache(self._path('.fragment_cache'))
+        report = ReportBuilder(self._path('report.docx'), report_class=OoxmlWordReportBuilder,
+                               source_list=SourceList(), fragment_cache=fragment_cache,
+                               listing_reader=listing_reader)
+
+        for number in range(3):
+            report.add_section(f"Розділ {number}")
+            report.add_text("Текст")
+            report.add_listing(self._path(f'listing_{number}.py'))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            report.save()
+
+        with zipfile.ZipFile(self._path('report.docx')) as document:
+            return document.read('word/document.xml'), fragment_cache.reused
+
+    def test_key_changes_when_a_listing_changes(self):
+        _write(self._path('main.py'), "print(1)\n")
+        actions = [('add_section', ("Розділ",), {}), ('add_listing', (self._path('main.py'),), {})]
+        key = self._get_key(actions)
+
+        self.assertEqual(self._get_key(actions), key)
+
+        _write(self._path('main.py'), "print(1)\nprint(2)\n")
+        self.assertNotEqual(self._get_key(actions), key)
+
+    def test_key_changes_when_an_image_from_the_images_directory_changes(self):
+        os.mkdir(self._path('Images'))
+        Image.new('RGB', (10, 10)).save(self._path('Images', 'scheme.png'))
+        actions = [('add_image', ('missing/scheme.png', "Схема"), {})]
+        key = self._get_key(actions)
+
+        Image.new('RGB', (40, 30), (200, 10, 10)).save(self._path('Images', 'scheme.png'))
+        self.assertNotEqual(self._get_key(actions), key)
+
+    def test_key_depends_on_the_state_before_the_section(self):
+        actions = [('add_text', ("Текст",), {})]
+
+        self.assertNotEqual(self._get_key(actions, (1, 0)), self._get_key(actions, (1, 100)))
+
+    def test_prune_keeps_only_the_fragments_of_the_last_build(self):
+        cache = FragmentCache(self._path('.fragment_cache'))
+        cache.store('old', {'media': []})
+        cache.store('current', {'media': []})
+
+        cache = FragmentCache(self._path('.fragment_cache'))
+        self.assertIsNotNone(cache.load('current'))
+        cache.prune()
+
+        self.assertEqual(os.listdir(self._path('.fragment_cache')), ['current.pickle'])
+
+    def test_unchanged_sections_are_reused(self):
+        for number in range(3):
+            _write(self._path(f'listing_{number}.py'), "x = 1\n")
+
+        self._build()
+        _write(self._path('listing_1.py'), "y = 2\n")
+        document, reused = self._build()
+
+        self.assertEqual(reused, 2)
+        self.assertIn(b"y = 2", document)
+        self.assertEqual(document.count(b"x = 1"), 2)
+
+    def test_changed_listing_limits_render_the_sections_again(self):
+        for number in range(3):
+            _write(self._path(f'listing_{number}.py'), "x = 1\n" * 100)
+
+        truncated, _ = self._build(ListingReader(max_file_bytes=30))
+        document, reused = self._build(ListingReader())
+
+        self.assertEqual(truncated.count(b"x = 1"), 15)
+        self.assertEqual(reused, 0)
+        self.assertEqual(document.count(b"x = 1"), 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+from xml.dom import minidom
+
+from FragmentCache import FragmentCache
+from ListingReader import ListingReader
+from OoxmlWordReportBuilder import OoxmlWordReportBuilder
+from ReportBuilder import ReportBuilder
+from SourceList import SourceList
+
+
+def _write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+class _FailingListingReader(ListingReader):
+    """
+    Fails with an OSError after the first chunk of every listing.
+    """
+
+    def read(self, file_path, data=None):
+        chunks = super().read(file_path, data)
+        yield next(chunks)
+        raise OSError("диск недоступний")
+
+
+class ListingReaderTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+        # Images that are not found are looked up in the Images directory of the working directory.
+        chdir = contextlib.chdir(self.directory)
+        chdir.__enter__()
+        self.addCleanup(chdir.__exit__, None, None, None)
+
+    def _path(self, *names):
+        return os.path.join(self.directory, *names)
+
+    def _read(self, content, listing_reader):
+        path = self._path('listing.py')
+
+        with open(path, 'wb') as f:
+            f.write(content)
+
+        return "".join(listing_reader.read(path))
+
+    def _build(self, filename, last_text, fragment_cache):
+        report = ReportBuilder(self._path(filename), report_class=OoxmlWordReportBuilder, source_list=SourceList(),
+                               fragment_cache=fragment_cache, listing_reader=ListingReader(max_report_bytes=4000))
+
+        for number in range(4):
+            report.add_section(f"Розділ {number}")
+            report.add_text(last_text if number == 3 else "Текст")
+            report.add_listing(self._path(f'listing_{number}.py'))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            report.save()
+
+        with zipfile.ZipFile(self._path(filename)) as document:
+            return document.read('word/document.xml')
+
+    def test_whole_file_fits(self):
+        self.assertEqual(self._read(b"ab\r\ncd\r\nef", ListingReader(chunk_size=3)), "ab\ncd\nef")
+
+    def test_truncation_drops_the_partial_line(self):
+        text = self._read(b"ab\r\ncd\r\n", ListingReader(max_file_bytes=5))
+
+        self.assertEqual(text, "ab\n[... лістинг скорочено: показано 4 з 8 байт ...]")
+
+    def test_truncation_at_a_chunk_boundary(self):
+        text = self._read(b"ab\ncd\nef\n", ListingReader(max_file_bytes=6, chunk_size=3))
+
+        self.assertEqual(text, "ab\ncd\n[... лістинг скорочено: показано 6 з 9 байт ...]")
+
+    def test_truncation_across_chunks(self):
+        for chunk_size in range(1, 12):
+            with self.subTest(chunk_size=chunk_size):
+                text = self._read(b"ab\r\ncdefgh\r\nij\r\n", ListingReader(max_file_bytes=10, chunk_size=chunk_size))
+
+                self.assertEqual(text, "ab\n[... лістинг скорочено: показано 4 з 16 байт ...]")
+
+    def test_truncation_after_a_line_break_that_ends_a_chunk(self):
+        text = self._read(b"ab\r\ncd\r\n", ListingReader(max_file_bytes=5, chunk_size=3))
+
+        self.assertEqual(text, "ab\n[... лістинг скорочено: показано 4 з 8 байт ...]")
+
+    def test_overlong_first_line_is_shown_in_part(self):
+        text = self._read(b"abcdefgh\nij\n", ListingReader(max_file_bytes=5, chunk_size=2))
+
+        self.assertEqual(text, "abcde\n[... лістинг скорочено: показано 5 з 12 байт ...]")
+
+    def test_report_budget_is_shared_by_listings(self):
+        listing_reader = ListingReader(max_report_bytes=11)
+
+        self.assertEqual(self._read(b"abc\ndef\n", listing_reader), "abc\ndef\n")
+        self.assertEqual(self._read(b"gh\nij\n", listing_reader),
+                         "gh\n[... лістинг скорочено: показано 3 з 6 байт ...]")
+        self.assertEqual(listing_reader.report_bytes, 11)
+        self.assertIsNotNone(listing_reader.check(self._path('listing.py')))
+
+    def test_reused_sections_use_up_the_listing_budget(self):
+        for number in range(4):
+            _write(self._path(f'listing_{number}.py'), "x = 1\n" * 300)
+
+        self._build('first.docx', "Текст", FragmentCache(self._path('.fragment_cache')))
+        incremental = self._build('incremental.docx', "Змінений текст", FragmentCache(self._path('.fragment_cache')))
+        full = self._build('full.docx', "Змінений текст", None)
+
+        self.assertEqual(incremental, full)
+
+    def test_read_error_leaves_the_document_well_formed(self):
+        _write(self._path('listing.py'), "x = 1\n" * 300)
+
+        report = ReportBuilder(self._path('report.docx'), report_class=OoxmlWordReportBuilder,
+                               source_list=SourceList(), listing_reader=_FailingListingReader(chunk_size=64))
+        report.add_section("Розділ")
+        report.add_listing(self._path('listing.py'))
+        report.add_text("Після лістингу")
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            report.save()
+
+        with zipfile.ZipFile(self._path('report.docx')) as document:
+            document_xml = document.read('word/document.xml')
+
+        self.assertIn("диск недоступний", output.getvalue())
+        self.assertIn("Після лістингу", minidom.parseString(document_xml).documentElement.toxml())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from NestedText import (ENDS_LIST, OPENS_SUBLIST, STARTS_LIST, flatten_nested_list, parse_nested_text,
+                        punctuate, to_nested_items)
+
+
+class NestedTextTest(unittest.TestCase):
+    def test_flatten_sets_levels_and_flags(self):
+        items = flatten_nested_list(["a", ["b", "c"], "d"])
+
+        self.assertEqual(list(items), [
+            (0, "a", STARTS_LIST | OPENS_SUBLIST),
+            (1, "b", STARTS_LIST),
+            (1, "c", ENDS_LIST),
+            (0, "d", ENDS_LIST),
+        ])
+        self.assertFalse(items.is_flat())
+
+    def test_flat_list_stays_flat(self):
+        items = flatten_nested_list(["a", "b"])
+
+        self.assertEqual(list(items), [(0, "a", STARTS_LIST), (0, "b", ENDS_LIST)])
+        self.assertTrue(items.is_flat())
+
+    def test_sublist_at_the_end_of_a_list(self):
+        items = flatten_nested_list(["a", ["b", ["c"]]])
+
+        self.assertEqual(list(items), [
+            (0, "a", STARTS_LIST | OPENS_SUBLIST),
+            (1, "b", STARTS_LIST | OPENS_SUBLIST),
+            (2, "c", STARTS_LIST | ENDS_LIST),
+        ])
+
+    def test_deep_nesting_needs_no_recursion(self):
+        depth = 5000
+        items = ["bottom"]
+        for _ in range(depth):
+            items = ["item", items]
+
+        flattened = flatten_nested_list(items)
+
+        self.assertEqual(len(flattened), depth + 1)
+        self.assertEqual(flattened.levels[-1], depth)
+
+    def test_indented_text_matches_nested_lists(self):
+        text = "a\n    b\n\tc\n        d\n\ne\n"
+
+        self.assertEqual(list(parse_nested_text(text)), list(flatten_nested_list(["a", ["b", "c", ["d"]], "e"])))
+        self.assertEqual(list(to_nested_items(text)), list(parse_nested_text(text)))
+
+    def test_numbering_restarts_in_every_list(self):
+        items = flatten_nested_list(["a", ["b", "c"], "d"])
+
+        self.assertEqual([number for _, _, _, number in items.numbered()], [1, 1, 2, 2])
+
+    def test_punctuate(self):
+        self.assertEqual(punctuate("item -", OPENS_SUBLIST), "item:")
+        self.assertEqual(punctuate("item.", ENDS_LIST), "item.")
+        self.assertEqual(punctuate("item", 0), "item;")
+
+
+if __name__ == '__main__':
+    unittest.main()
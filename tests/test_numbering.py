@@ -0,0 +1,62 @@
+import unittest
+
+from Numbering import Numbering
+
+
+def _number_part(numbering):
+    """
+    Numbers a section with a sub-section and a few elements, returning the labels.
+    """
+    return [numbering.start_heading(0), numbering.next_label('image'), numbering.start_heading(1),
+            numbering.next_label('image'), numbering.next_label('listing'), numbering.next_label('image')]
+
+
+class NumberingTest(unittest.TestCase):
+    def test_labels_follow_the_deepest_heading(self):
+        numbering = Numbering(1)
+
+        self.assertEqual(_number_part(numbering), ["2", "2.1", "2.1", "2.1.1", "2.1.1", "2.1.2"])
+        self.assertEqual(numbering.start_heading(0), "3")
+        self.assertEqual(numbering.next_label('image'), "3.1")
+
+    def test_restore_continues_where_the_snapshot_was_taken(self):
+        numbering = Numbering()
+        _number_part(numbering)
+        snapshot = numbering.snapshot()
+        expected = _number_part(numbering)
+
+        restored = Numbering()
+        restored.restore(snapshot)
+        self.assertEqual(_number_part(restored), expected)
+
+        # Restoring also rewinds a numbering that has gone further.
+        numbering.restore(snapshot)
+        self.assertEqual(_number_part(numbering), expected)
+
+    def test_restore_drops_the_cached_prefix(self):
+        numbering = Numbering()
+        numbering.start_heading(0)
+        snapshot = numbering.snapshot()
+
+        numbering.start_heading(0)
+        numbering.next_label('table')
+        numbering.restore(snapshot)
+
+        self.assertEqual(numbering.next_label('table'), "1.1")
+
+    def test_snapshot_is_a_hashable_copy(self):
+        numbering = Numbering()
+        _number_part(numbering)
+        snapshot = numbering.snapshot()
+        hash(snapshot)
+
+        restored = Numbering()
+        restored.restore(snapshot)
+        restored.next_label('image')
+
+        self.assertEqual(numbering.snapshot(), snapshot)
+        self.assertNotEqual(restored.snapshot(), snapshot)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import contextlib
+import io
+import os
+import tempfile
+import tracemalloc
+import unittest
+
+from ListingReader import ListingReader
+from OoxmlWordReportBuilder import OoxmlWordReportBuilder
+from Prefetcher import Prefetcher
+from ReportBuilder import ReportBuilder
+from SourceList import SourceList
+
+
+class PrefetcherTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def _write_listings(self, count, size):
+        paths = []
+        line = "x = 1  # " + "a" * 53 + "\n"
+
+        for number in range(count):
+            path = os.path.join(self.directory, f"listing_{number}.py")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(line * (size // len(line)))
+            paths.append(path)
+
+        return paths
+
+    def _build(self, listing_paths, prefetch_bytes):
+        report = ReportBuilder(os.path.join(self.directory, "report.docx"), report_class=OoxmlWordReportBuilder,
+                               source_list=SourceList(), listing_reader=ListingReader(max_report_bytes=1 << 30),
+                               prefetch_bytes=prefetch_bytes)
+        report.add_section("Розділ")
+
+        for listing_path in listing_paths:
+            report.add_listing(listing_path)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            report.save()
+
+    def test_memory_stays_near_the_byte_cap(self):
+        listing_paths = self._write_listings(40, 1 << 20)
+        prefetch_bytes = 4 << 20
+
+        # The first build prepares the shared base document, which is not part of the measurement.
+        self._build(listing_paths[:1], prefetch_bytes)
+
+        tracemalloc.start()
+        try:
+            self._build(listing_paths, prefetch_bytes)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        # The waiting listings, the one being rendered and the XML of one chunk.
+        self.assertLess(peak, prefetch_bytes + (3 << 20))
+
+    def test_actions_come_out_in_order(self):
+        listing_paths = self._write_listings(5, 1000)
+        actions = [('add_text', ("Текст",), {})] + [('add_listing', (path,), {}) for path in listing_paths]
+        prefetcher = Prefetcher(None, ListingReader(), 0, window=2, max_bytes=1500)
+
+        try:
+            prefetched = list(prefetcher.prefetch(actions))
+        finally:
+            prefetcher.shutdown()
+
+        self.assertEqual([action[:2] for action in prefetched], [action[:2] for action in actions])
+        for method_name, args, kwargs in prefetched[1:]:
+            with open(args[0], 'rb') as f:
+                self.assertEqual(kwargs['data'].result(), f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import contextlib
+import os
+import tempfile
+import unittest
+
+from FileScanner import DEFAULT_IGNORE_PATTERNS
+from ReportSpec import _get_plan_key
+
+
+def _write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+class PlanKeyTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+        # Spec paths are relative to the working directory.
+        chdir = contextlib.chdir(self.directory)
+        chdir.__enter__()
+        self.addCleanup(chdir.__exit__, None, None, None)
+
+    def _path(self, *names):
+        return os.path.join(self.directory, *names)
+
+    def _get_key(self, value):
+        return _get_plan_key({'content': [{'listings_of_all_files': value}]}, b"{}", DEFAULT_IGNORE_PATTERNS)
+
+    def test_key_changes_when_a_file_is_added(self):
+        os.mkdir(self._path('src'))
+        _write(self._path('src', 'main.py'), "print(1)\n")
+        key = self._get_key('src')
+
+        _write(self._path('src', 'util.py'), "print(2)\n")
+        self.assertNotEqual(self._get_key('src'), key)
+
+    def test_all_element_forms_name_the_directory(self):
+        os.mkdir(self._path('src'))
+        _write(self._path('src', 'main.py'), "print(1)\n")
+
+        key = self._get_key('src')
+
+        self.assertEqual(self._get_key({'directory': 'src'}), key)
+        self.assertEqual(self._get_key(['src']), key)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from SourceList import SourceList
+
+
+class SourceListTest(unittest.TestCase):
+    def test_repeated_source_keeps_its_number(self):
+        source_list = SourceList()
+
+        self.assertEqual(source_list.add_sources(["Книга А", "Книга Б", "Книга А"]), [1, 2, 1])
+        self.assertEqual(source_list.get_sources(), {1: "Книга А", 2: "Книга Б"})
+
+    def test_without_normalize_spelling_matters(self):
+        source_list = SourceList()
+
+        self.assertEqual(source_list.add_sources(["Книга А.", "книга  а"]), [1, 2])
+
+    def test_normalize_ignores_case_whitespace_and_punctuation(self):
+        source_list = SourceList(normalize=True)
+        numbers = source_list.add_sources(["Іванов І. Основи, 2020.", "іванов  І Основи 2020", "Петров П. Мережі"])
+
+        self.assertEqual(numbers, [1, 1, 2])
+        # The first spelling is the one listed.
+        self.assertEqual(source_list.get_sources(), {1: "Іванов І. Основи, 2020.", 2: "Петров П. Мережі"})
+
+    def test_add_sources_matches_add_source(self):
+        texts = ["a", "b", "A", "a!", "c", "b"]
+        one_by_one = SourceList(normalize=True)
+
+        self.assertEqual(SourceList(normalize=True).add_sources(texts), [one_by_one.add_source(text) for text in texts])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import random
+import unittest
+
+from TextCleaner import TextCleaner
+
+
+class TextCleanerTest(unittest.TestCase):
+    def test_conjunctions_alternate_across_texts(self):
+        self.assertEqual(TextCleaner().clean_many(["а і б", "в та г і д", " е і є. "]),
+                         ["а і б", "в та г і д", "е та є"])
+
+    def test_clean_many_matches_clean_text_called_in_turn(self):
+        rng = random.Random(0)
+        words = ["і", "та", "слово", "-", "текст.", "\n", "  "]
+        texts = [" ".join(rng.choice(words) for _ in range(rng.randrange(12))) for _ in range(200)]
+
+        sequential_cleaner = TextCleaner()
+        expected = [sequential_cleaner.clean_text(text) for text in texts]
+
+        many_cleaner = TextCleaner()
+        self.assertEqual(many_cleaner.clean_many(texts), expected)
+        self.assertEqual(many_cleaner.prev_and, sequential_cleaner.prev_and)
+
+        # A later call carries on from where the previous one stopped.
+        self.assertEqual(many_cleaner.clean_many(["і"]), [sequential_cleaner.clean_text("і")])
+
+
+if __name__ == '__main__':
+    unittest.main()